@@ -0,0 +1,129 @@
+"""
+Analytics rollups for TechGuide Bot
+Counters updated on every write path, kept in fixed-width time buckets so
+/stats costs O(buckets) no matter how much traffic there was.
+"""
+
+import os
+import time
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Any, Optional
+
+STATS_BUCKET_SECONDS = int(os.getenv("STATS_BUCKET_SECONDS", "300"))
+# 288 five-minute buckets = 24 hours of history
+STATS_RETENTION_BUCKETS = int(os.getenv("STATS_RETENTION_BUCKETS", "288"))
+# Classification confidence histogram: CONFIDENCE_BINS equal bins over [0, 1]
+CONFIDENCE_BINS = 10
+
+class Rollup:
+    """Counters for one time bucket (or for all time)"""
+
+    __slots__ = ("chats", "techguide", "ai", "fallback", "clarifications",
+                 "recommendations", "tiers", "confidence")
+
+    def __init__(self):
+        self.chats = 0
+        self.techguide = 0
+        self.ai = 0
+        self.fallback = 0
+        self.clarifications = 0
+        self.recommendations: Counter = Counter()
+        self.tiers: Counter = Counter()
+        self.confidence = [0] * CONFIDENCE_BINS
+
+    def add(self, endpoint: str, result: Dict[str, Any]):
+        if endpoint == "chat":
+            self.chats += 1
+        else:
+            self.techguide += 1
+        if result.get("ai_powered"):
+            self.ai += 1
+        else:
+            self.fallback += 1
+        if result.get("status") == "clarification_needed":
+            self.clarifications += 1
+        if result.get("status") == "ok" and result.get("language"):
+            self.recommendations[result["language"]] += 1
+
+        classification = (result.get("metadata") or {}).get("classification")
+        if classification:
+            self.tiers[classification.get("tier", "unknown")] += 1
+            confidence = classification.get("confidence")
+            if isinstance(confidence, (int, float)):
+                index = min(int(max(confidence, 0.0) * CONFIDENCE_BINS), CONFIDENCE_BINS - 1)
+                self.confidence[index] += 1
+
+    def merge(self, other: "Rollup"):
+        self.chats += other.chats
+        self.techguide += other.techguide
+        self.ai += other.ai
+        self.fallback += other.fallback
+        self.clarifications += other.clarifications
+        self.recommendations.update(other.recommendations)
+        self.tiers.update(other.tiers)
+        self.confidence = [a + b for a, b in zip(self.confidence, other.confidence)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        requests = self.chats + self.techguide
+        return {
+            "requests": requests,
+            "chats": self.chats,
+            "techguide": self.techguide,
+            "ai": self.ai,
+            "fallback": self.fallback,
+            "ai_rate": round(self.ai / requests, 3) if requests else None,
+            "clarification_rate": round(self.clarifications / requests, 3) if requests else None,
+            "recommendations": dict(self.recommendations.most_common()),
+            "tiers": dict(self.tiers),
+            "confidence_histogram": {
+                f"{i / CONFIDENCE_BINS:.1f}-{(i + 1) / CONFIDENCE_BINS:.1f}": count
+                for i, count in enumerate(self.confidence)
+            }
+        }
+
+class Analytics:
+    """All-time totals plus a ring of time buckets, oldest evicted first"""
+
+    def __init__(self, bucket_seconds: int = STATS_BUCKET_SECONDS,
+                 retention: int = STATS_RETENTION_BUCKETS):
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+        self._lock = threading.Lock()
+        self.totals = Rollup()
+        self._buckets: "OrderedDict[int, Rollup]" = OrderedDict()
+
+    def record(self, endpoint: str, result: Dict[str, Any], now: Optional[float] = None):
+        """Count one /chat or /techguide result; O(1)"""
+        start = int((time.time() if now is None else now) // self.bucket_seconds) * self.bucket_seconds
+        with self._lock:
+            bucket = self._buckets.get(start)
+            if bucket is None:
+                bucket = self._buckets[start] = Rollup()
+                while len(self._buckets) > self.retention:
+                    self._buckets.popitem(last=False)
+            bucket.add(endpoint, result)
+            self.totals.add(endpoint, result)
+
+    def stats(self, window_seconds: int, now: Optional[float] = None) -> Dict[str, Any]:
+        """Rollup of the buckets overlapping the last ``window_seconds`` plus all-time totals"""
+        cutoff = (time.time() if now is None else now) - window_seconds
+        window = Rollup()
+        buckets = 0
+        with self._lock:
+            for start, bucket in reversed(self._buckets.items()):
+                if start + self.bucket_seconds <= cutoff:
+                    break
+                window.merge(bucket)
+                buckets += 1
+            totals = self.totals.to_dict()
+        return {
+            "window_seconds": window_seconds,
+            "bucket_seconds": self.bucket_seconds,
+            "buckets": buckets,
+            "window": window.to_dict(),
+            "all_time": totals
+        }
+
+# Global instance
+analytics = Analytics()
@@ -0,0 +1,130 @@
+"""
+Overload brownout for TechGuide Bot
+Watches event-loop lag, in-flight AI calls and queue wait, and sheds AI
+work in steps when they run hot: no streaming, then short answers, then
+keyword-only classification. Steps down again with hysteresis.
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+# Pressure 1.0 = a signal at its threshold; the highest of the three counts
+BROWNOUT_MAX_LOOP_LAG_MS = float(os.getenv("BROWNOUT_MAX_LOOP_LAG_MS", "200"))
+BROWNOUT_MAX_AI_IN_FLIGHT = int(os.getenv("BROWNOUT_MAX_AI_IN_FLIGHT", "16"))
+BROWNOUT_MAX_QUEUE_WAIT_MS = float(os.getenv("BROWNOUT_MAX_QUEUE_WAIT_MS", "500"))
+# A level is left once pressure stays below BROWNOUT_RECOVERY_RATIO x its
+# entry pressure for BROWNOUT_RECOVERY_SECONDS (one level at a time)
+BROWNOUT_RECOVERY_RATIO = float(os.getenv("BROWNOUT_RECOVERY_RATIO", "0.7"))
+BROWNOUT_RECOVERY_SECONDS = float(os.getenv("BROWNOUT_RECOVERY_SECONDS", "30"))
+BROWNOUT_INTERVAL = float(os.getenv("BROWNOUT_INTERVAL", "1"))
+# AI output cap from level 2 ("short_answers")
+BROWNOUT_MAX_OUTPUT_TOKENS = int(os.getenv("BROWNOUT_MAX_OUTPUT_TOKENS", "256"))
+# Weight of the newest queue-wait sample in its moving average
+QUEUE_WAIT_ALPHA = 0.2
+
+LEVELS = ("normal", "no_streaming", "short_answers", "keywords_only")
+# Pressure at which each level (1, 2, 3) is entered
+LEVEL_PRESSURE = (1.0, 1.5, 2.0)
+
+class BrownoutController:
+    """
+    The level only changes in evaluate(), which a background task calls
+    every BROWNOUT_INTERVAL seconds. Request paths read it with plain
+    attribute access.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.level = 0
+        self.ai_in_flight = 0
+        self.queue_wait_ms = 0.0
+        self.loop_lag_ms = 0.0
+        self.pressure = 0.0
+        self._calm_since: Optional[float] = None
+        self.changed_at = time.time()
+        self.transitions = 0
+        self.shed = {"streams": 0, "shortened": 0, "ai_skipped": 0}
+
+    @contextmanager
+    def track_ai(self) -> Iterator[None]:
+        with self._lock:
+            self.ai_in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.ai_in_flight -= 1
+
+    def record_queue_wait(self, wait_ms: float):
+        with self._lock:
+            self.queue_wait_ms += QUEUE_WAIT_ALPHA * (wait_ms - self.queue_wait_ms)
+
+    def evaluate(self, loop_lag_ms: float, now: Optional[float] = None) -> int:
+        """Recompute pressure and move the level; returns the new level"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self.loop_lag_ms = loop_lag_ms
+            # Idle periods record no waits, so the average also decays on its own
+            self.queue_wait_ms *= 1 - QUEUE_WAIT_ALPHA
+            self.pressure = max(
+                loop_lag_ms / BROWNOUT_MAX_LOOP_LAG_MS,
+                self.ai_in_flight / BROWNOUT_MAX_AI_IN_FLIGHT,
+                self.queue_wait_ms / BROWNOUT_MAX_QUEUE_WAIT_MS
+            )
+            target = sum(self.pressure >= threshold for threshold in LEVEL_PRESSURE)
+            if target > self.level:
+                self._set_level(target, now)
+            elif self.level and self.pressure < LEVEL_PRESSURE[self.level - 1] * BROWNOUT_RECOVERY_RATIO:
+                if self._calm_since is None:
+                    self._calm_since = now
+                elif now - self._calm_since >= BROWNOUT_RECOVERY_SECONDS:
+                    self._set_level(self.level - 1, now)
+            else:
+                self._calm_since = None
+            return self.level
+
+    def _set_level(self, level: int, now: float):
+        # Each step down has to earn its own calm period
+        self._calm_since = now if level < self.level else None
+        self.level = level
+        self.changed_at = now
+        self.transitions += 1
+
+    def allow_streaming(self) -> bool:
+        if self.level >= 1:
+            self.shed["streams"] += 1
+            return False
+        return True
+
+    def max_output_tokens(self) -> Optional[int]:
+        if self.level >= 2:
+            self.shed["shortened"] += 1
+            return BROWNOUT_MAX_OUTPUT_TOKENS
+        return None
+
+    def allow_ai(self) -> bool:
+        if self.level >= 3:
+            self.shed["ai_skipped"] += 1
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "level": self.level,
+                "mode": LEVELS[self.level],
+                "pressure": round(self.pressure, 3),
+                "loop_lag_ms": round(self.loop_lag_ms, 1),
+                "ai_in_flight": self.ai_in_flight,
+                "queue_wait_ms": round(self.queue_wait_ms, 1),
+                "since": datetime.fromtimestamp(self.changed_at).isoformat(),
+                "transitions": self.transitions,
+                "shed": dict(self.shed)
+            }
+
+# Global instance
+brownout = BrownoutController()
@@ -0,0 +1,305 @@
+"""
+Bulk classification for TechGuide Bot
+Runs large exports through the same local cascade as /chat, offline:
+inputs are streamed in chunks to a process pool, results are written as
+NDJSON in input order, and only a bounded window of chunks is in memory.
+
+    python bulk_classify.py exports/messages.csv -o results.ndjson --workers 8
+    cat messages.txt | python bulk_classify.py - --ai --ai-concurrency 4 > results.ndjson
+
+Each output line is {"record", "category", "language", "tier",
+"confidence", "source"}, plus "id" with --id-field. "record" counts input
+records (text lines, NDJSON lines or CSV rows) across all inputs,
+starting at 1. Blank records are skipped; invalid ones, and records without
+the text field, get an "error". A CSV header without the field is fatal.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from knowledge_base import knowledge_base
+from cascade import cascade
+
+# Records sent to a worker at a time
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+# Chunks in flight per worker; bounds memory and keeps the pool busy
+BULK_CHUNKS_PER_WORKER = int(os.getenv("BULK_CHUNKS_PER_WORKER", "2"))
+# Parallel AI classifications with --ai (the provider's rate limits apply)
+BULK_AI_CONCURRENCY = int(os.getenv("BULK_AI_CONCURRENCY", "4"))
+
+FORMATS = ("txt", "ndjson", "csv")
+
+# (record number, id, text, error)
+Item = Tuple[int, Optional[str], Optional[str], Optional[str]]
+
+class InputError(Exception):
+    """An input cannot be read at all (as opposed to one bad record)"""
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "ndjson"
+    return "txt"
+
+def _records(f: TextIO, fmt: str, field: str, id_field: Optional[str]) -> Iterator[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """(id, text, error) per record of one open input; (None, None, None) is a blank record"""
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for column in (field, id_field):
+            if column and column not in (reader.fieldnames or ()):
+                raise InputError(f"CSV header has no {column!r} column (columns: {', '.join(reader.fieldnames or ())})")
+        for row in reader:
+            record_id = row.get(id_field) if id_field else None
+            # Short rows fill missing columns with None
+            if row[field] is None:
+                yield record_id, None, f"{field} missing"
+            else:
+                yield record_id, row[field], None
+        return
+    for line in f:
+        if fmt == "txt":
+            yield None, line.rstrip("\r\n"), None
+            continue
+        if not line.strip():
+            yield None, None, None
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield None, None, f"invalid JSON: {e.msg}"
+            continue
+        if isinstance(record, str):
+            yield None, record, None
+        elif isinstance(record, dict):
+            record_id = record.get(id_field) if id_field else None
+            record_id = None if record_id is None else str(record_id)
+            if field in record:
+                yield record_id, record[field], None
+            else:
+                yield record_id, None, f"{field} missing"
+        else:
+            yield None, None, "not an object or a string"
+
+def read_items(paths: Iterable[str], fmt: Optional[str], field: str, id_field: Optional[str]) -> Iterator[Item]:
+    """Stream every non-blank record of ``paths`` ("-" is stdin) as work items"""
+    counter = itertools.count(1)
+    for path in paths:
+        path_fmt = fmt or ("txt" if path == "-" else detect_format(path))
+        try:
+            f = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="" if path_fmt == "csv" else None)
+        except OSError as e:
+            raise InputError(f"{path}: {e.strerror}") from e
+        try:
+            for record_id, text, error in _records(f, path_fmt, field, id_field):
+                record = next(counter)
+                if error:
+                    yield record, record_id, None, error
+                elif isinstance(text, str):
+                    if text.strip():
+                        yield record, record_id, text, None
+                elif text is not None:
+                    yield record, record_id, None, f"{field} is not a string"
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+def chunked(items: Iterator[Item], size: int) -> Iterator[List[Item]]:
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+# ============================================================================
+# CLASSIFICATION
+# ============================================================================
+
+def _result(item: Item, decision: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    record, record_id, _, error = item
+    result: Dict[str, Any] = {"record": record}
+    if record_id is not None:
+        result["id"] = record_id
+    if error:
+        result["error"] = error
+        return result
+    category = knowledge_base.current().get(decision["category"]) if decision["category"] else None
+    result.update({
+        "category": decision["category"],
+        "language": category.lang if category else None,
+        "tier": decision["tier"],
+        "confidence": decision["confidence"],
+        "source": decision["classification"].get("source")
+    })
+    return result
+
+def classify_chunk(chunk: List[Item]) -> List[Dict[str, Any]]:
+    """Worker process: the local tiers for every item (never calls the AI)"""
+    kb = knowledge_base.current()
+    return [
+        _result(item, None if item[3] else cascade.classify_locally(item[2], kb))
+        for item in chunk
+    ]
+
+def classify_with_ai(text: str) -> Dict[str, Any]:
+    """Parent thread: the AI tier for one item the local tiers left open"""
+    from ai_helper import ai_helper
+    return cascade.classify_with_ai(text, knowledge_base.current(), ai_helper.classify_interest)
+
+class BulkClassifier:
+    """
+    Ordered two-stage pipeline. Chunks go to the process pool; at most
+    ``workers * BULK_CHUNKS_PER_WORKER`` are submitted and not yet written.
+    Finished chunks are handled in input order. Their unresolved items go
+    to a thread pool of ``ai_concurrency`` threads, and a chunk is written
+    once all of its AI answers are in.
+    """
+
+    def __init__(self, out: TextIO, workers: int, ai_concurrency: int = 0,
+                 progress_interval: float = 5.0):
+        self.out = out
+        self.workers = workers
+        self.window = max(1, workers * BULK_CHUNKS_PER_WORKER)
+        self.ai_concurrency = ai_concurrency
+        self.progress_interval = progress_interval
+        self.records = 0
+        self.tiers: Dict[str, int] = {}
+        self.unresolved = 0
+        self.errors = 0
+        self.ai_calls = 0
+        self._started = time.perf_counter()
+        self._last_report = self._started
+
+    def run(self, chunks: Iterable[List[Item]]) -> Dict[str, Any]:
+        # Spawned workers: the parent may already run AI client threads, which fork does not copy safely
+        context = multiprocessing.get_context("spawn")
+        ai_pool = ThreadPoolExecutor(self.ai_concurrency, thread_name_prefix="bulk-ai") if self.ai_concurrency else None
+        with ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+            local: deque = deque()
+            waiting_ai: deque = deque()
+            for chunk in chunks:
+                local.append((chunk, pool.submit(classify_chunk, chunk)))
+                while len(local) + len(waiting_ai) >= self.window:
+                    self._advance(local, waiting_ai, ai_pool)
+            while local or waiting_ai:
+                self._advance(local, waiting_ai, ai_pool)
+        if ai_pool:
+            ai_pool.shutdown()
+        self._report(final=True)
+        return self.summary()
+
+    def _advance(self, local: deque, waiting_ai: deque, ai_pool: Optional[ThreadPoolExecutor]):
+        """Write what is ready, otherwise block on the oldest chunk of either stage"""
+        if waiting_ai and all(future.done() for _, future in waiting_ai[0][1]):
+            self._write(*waiting_ai.popleft())
+        elif local and (not waiting_ai or local[0][1].done()):
+            chunk, future = local.popleft()
+            results = future.result()
+            ai_futures: List[Tuple[int, Future]] = []
+            if ai_pool:
+                for index, (item, result) in enumerate(zip(chunk, results)):
+                    if "error" not in result and result["category"] is None:
+                        ai_futures.append((index, ai_pool.submit(classify_with_ai, item[2])))
+            # Later chunks may finish their AI calls first; they still wait their turn
+            waiting_ai.append((chunk, ai_futures, results))
+        else:
+            for _, future in waiting_ai[0][1]:
+                future.exception()
+        self._report()
+
+    def _write(self, chunk: List[Item], ai_futures: List[Tuple[int, Future]], results: List[Dict[str, Any]]):
+        for index, future in ai_futures:
+            self.ai_calls += 1
+            try:
+                results[index] = _result(chunk[index], future.result())
+            except Exception as e:
+                results[index]["ai_error"] = str(e)[:200]
+        for result in results:
+            if "error" in result:
+                self.errors += 1
+            elif result["category"] is None:
+                self.unresolved += 1
+            else:
+                self.tiers[result["tier"]] = self.tiers.get(result["tier"], 0) + 1
+            self.out.write(json.dumps(result, separators=(",", ":")) + "\n")
+        self.out.flush()
+        self.records += len(results)
+
+    def _report(self, final: bool = False):
+        now = time.perf_counter()
+        if not final and (self.progress_interval <= 0 or now - self._last_report < self.progress_interval):
+            return
+        self._last_report = now
+        elapsed = now - self._started
+        rate = self.records / elapsed if elapsed > 0 else 0.0
+        print(f"📊 {self.records:,} records in {elapsed:.1f}s ({rate:,.0f}/s), "
+              f"{self.unresolved:,} unresolved, {self.ai_calls:,} AI calls", file=sys.stderr)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        return {
+            "records": self.records,
+            "seconds": round(elapsed, 3),
+            "records_per_second": round(self.records / elapsed, 1) if elapsed > 0 else None,
+            "tiers": self.tiers,
+            "unresolved": self.unresolved,
+            "errors": self.errors,
+            "ai_calls": self.ai_calls
+        }
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Classify large text exports offline")
+    parser.add_argument("inputs", nargs="+", help="input files, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--format", choices=FORMATS, help="input format (default: from the file extension)")
+    parser.add_argument("--field", default="text", help="NDJSON key / CSV column holding the text")
+    parser.add_argument("--id-field", help="NDJSON key / CSV column copied to the output as id")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="records per worker task")
+    parser.add_argument("--ai", action="store_true", help="send records the local tiers leave open to the AI")
+    parser.add_argument("--ai-concurrency", type=int, default=BULK_AI_CONCURRENCY, help="parallel AI calls")
+    parser.add_argument("--progress", type=float, default=5.0, help="seconds between progress lines (0: off)")
+    args = parser.parse_args(argv)
+
+    ai_concurrency = 0
+    if args.ai:
+        from ai_helper import ai_helper
+        if ai_helper.is_enabled():
+            ai_concurrency = max(1, args.ai_concurrency)
+        else:
+            print("⚠️ AI not available; unresolved records stay unresolved", file=sys.stderr)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        items = read_items(args.inputs, args.format, args.field, args.id_field)
+        classifier = BulkClassifier(out, max(1, args.workers), ai_concurrency, args.progress)
+        summary = classifier.run(chunked(items, max(1, args.chunk_size)))
+    except InputError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
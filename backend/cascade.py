@@ -0,0 +1,261 @@
+"""
+Classification cascade for TechGuide Bot
+Cheap tiers first (exact keywords, then fuzzy keywords / local model);
+the AI is only asked when they are not confident enough.
+
+Replay a labeled corpus (JSONL lines of {"text": ..., "label": ...}):
+    python cascade.py data/labeled_corpus.jsonl [--ai]
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from knowledge_base import KnowledgeBase, FUZZY_MATCHING
+from local_model import local_classifier
+
+# Exact keyword tier: minimum top score and minimum share of all points
+CASCADE_EXACT_MIN_SCORE = float(os.getenv("CASCADE_EXACT_MIN_SCORE", "3"))
+CASCADE_EXACT_MIN_SHARE = float(os.getenv("CASCADE_EXACT_MIN_SHARE", "0.6"))
+# Local tier: the same test on typo-corrected scores, then the local model
+CASCADE_LOCAL_MIN_SCORE = float(os.getenv("CASCADE_LOCAL_MIN_SCORE", "2"))
+CASCADE_LOCAL_MIN_SHARE = float(os.getenv("CASCADE_LOCAL_MIN_SHARE", "0.6"))
+# AI tier: classify_interest answers below this confidence fall through to chat
+CASCADE_AI_MIN_CONFIDENCE = float(os.getenv("CASCADE_AI_MIN_CONFIDENCE", "0.6"))
+# Multi-turn context: earlier unresolved turns' keyword scores are multiplied by
+# CASCADE_CONTEXT_DECAY per new turn and summed (0 disables it). Two or more
+# turns together must reach CASCADE_CONTEXT_MIN_SCORE with CASCADE_LOCAL_MIN_SHARE
+CASCADE_CONTEXT_DECAY = float(os.getenv("CASCADE_CONTEXT_DECAY", "0.6"))
+CASCADE_CONTEXT_MIN_SCORE = float(os.getenv("CASCADE_CONTEXT_MIN_SCORE", "1.5"))
+# Latency samples kept per tier for percentiles
+CASCADE_LATENCY_WINDOW = int(os.getenv("CASCADE_LATENCY_WINDOW", "500"))
+
+TIERS = ("exact", "local", "ai_classify", "ai_chat")
+
+def classification_summary(classification: Dict[str, Any]) -> Dict[str, Any]:
+    """Non-zero scores plus the exact and fuzzy keyword hits behind them"""
+    return {
+        "scores": {k: v for k, v in classification["scores"].items() if v},
+        "matched_keywords": classification["matched_keywords"],
+        "fuzzy_matches": classification["fuzzy_matches"]
+    }
+
+def keyword_confidence(scores: Dict[str, int], min_score: float, min_share: float) -> Optional[Dict[str, Any]]:
+    """Top category and its share of all points, if it clears both thresholds"""
+    total = sum(scores.values())
+    if total <= 0:
+        return None
+    best = max(scores, key=scores.get)
+    share = scores[best] / total
+    if scores[best] < min_score or share < min_share:
+        return None
+    return {"category": best, "confidence": round(share, 3)}
+
+class ConversationScores:
+    """
+    Running keyword scores of a session's unresolved turns. Each turn adds
+    only the new message's scores to the decayed previous ones, so it costs
+    O(categories), not O(conversation). Reset once a category is chosen.
+    Concurrent turns of one session (a retry racing the original) each
+    see a consistent state, so add and reset hold a lock.
+    """
+
+    __slots__ = ("scores", "turns", "_lock")
+
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self.turns = 0
+        self._lock = threading.Lock()
+
+    def add(self, scores: Dict[str, float], decay: float = CASCADE_CONTEXT_DECAY) -> Tuple[Dict[str, float], int]:
+        """(combined scores, turns) as of this turn"""
+        with self._lock:
+            combined = {category: score * decay for category, score in self.scores.items() if score * decay >= 0.05}
+            for category, score in scores.items():
+                if score:
+                    combined[category] = combined.get(category, 0.0) + score
+            self.scores = combined
+            self.turns += 1
+            return combined, self.turns
+
+    def reset(self):
+        with self._lock:
+            self.scores = {}
+            self.turns = 0
+
+class TierStats:
+    __slots__ = ("attempts", "hits", "latencies")
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.latencies = deque(maxlen=CASCADE_LATENCY_WINDOW)
+
+class ClassificationCascade:
+    """
+    Runs the tiers in order and records, per tier, how often it was tried,
+    how often it produced a confident answer, and how long it took.
+
+    A decision is a dict with ``category`` (None when every tier tried was
+    unsure), ``tier``, ``confidence`` and ``classification`` metadata.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {tier: TierStats() for tier in TIERS}
+
+    def record(self, tier: str, hit: bool, started: float):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats = self._stats[tier]
+            stats.attempts += 1
+            stats.hits += hit
+            stats.latencies.append(elapsed_ms)
+
+    def classify_locally(self, text: str, kb: KnowledgeBase,
+                         context: Optional[ConversationScores] = None) -> Dict[str, Any]:
+        """
+        Exact keywords, then typo-corrected keywords and the local model,
+        then (with ``context``) this message's scores added to the earlier
+        unresolved turns of the session. Never calls the AI.
+        """
+        started = time.perf_counter()
+        exact = kb.classify(text, fuzzy=False)
+        decision = keyword_confidence(exact["scores"], CASCADE_EXACT_MIN_SCORE, CASCADE_EXACT_MIN_SHARE)
+        self.record("exact", decision is not None, started)
+        if decision:
+            if context is not None:
+                context.reset()
+            return {**decision, "tier": "exact", "classification": {**classification_summary(exact), "source": "keywords"}}
+
+        # The exact pass is reused; only typo-corrected words are scored here
+        started = time.perf_counter()
+        classification = kb.add_fuzzy(text, exact) if FUZZY_MATCHING else exact
+        summary = classification_summary(classification)
+        decision = keyword_confidence(classification["scores"], CASCADE_LOCAL_MIN_SCORE, CASCADE_LOCAL_MIN_SHARE)
+        if decision:
+            summary["source"] = "fuzzy_keywords" if classification["fuzzy_matches"] else "keywords"
+        else:
+            prediction = local_classifier.predict(text)
+            if prediction and kb.get(prediction[0]):
+                decision = {"category": prediction[0], "confidence": round(prediction[1], 3)}
+                summary["source"] = "local_model"
+        if context is not None and CASCADE_CONTEXT_DECAY > 0:
+            if decision:
+                context.reset()
+            else:
+                combined, turns = context.add(classification["scores"])
+                if turns > 1:
+                    decision = keyword_confidence(combined, CASCADE_CONTEXT_MIN_SCORE, CASCADE_LOCAL_MIN_SHARE)
+                if decision:
+                    summary["source"] = "conversation"
+                    summary["turns"] = turns
+                    summary["scores"] = {k: round(v, 3) for k, v in combined.items()}
+                    context.reset()
+        self.record("local", decision is not None, started)
+        if decision:
+            return {**decision, "tier": "local", "classification": summary}
+        return {"category": None, "tier": "local", "confidence": 0.0, "classification": summary}
+
+    def classify_with_ai(self, text: str, kb: KnowledgeBase, classify: Callable[[str], Dict[str, Any]],
+                         context: Optional[ConversationScores] = None) -> Dict[str, Any]:
+        """Ask ``classify`` (AIHelper.classify_interest) and accept a confident, known category"""
+        started = time.perf_counter()
+        result = classify(text)
+        category = str(result.get("category", "")).strip()
+        try:
+            confidence = float(result.get("confidence", 0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        hit = bool(result.get("success")) and kb.get(category) is not None and confidence >= CASCADE_AI_MIN_CONFIDENCE
+        self.record("ai_classify", hit, started)
+        if hit and context is not None:
+            context.reset()
+        classification = {
+            "source": "ai",
+            "confidence": confidence,
+            "reasoning": result.get("reasoning"),
+            "alternative": result.get("alternative")
+        }
+        return {
+            "category": category if hit else None,
+            "tier": "ai_classify",
+            "confidence": confidence,
+            "classification": classification
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {}
+            for tier, stats in self._stats.items():
+                latencies = sorted(stats.latencies)
+                tiers[tier] = {
+                    "attempts": stats.attempts,
+                    "hits": stats.hits,
+                    "hit_rate": round(stats.hits / stats.attempts, 3) if stats.attempts else None,
+                    "p50_ms": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95)], 3) if latencies else None
+                }
+            return tiers
+
+def replay(path: str, kb: KnowledgeBase, classify: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Run every labeled line of ``path`` through a fresh cascade and report
+    accuracy per answering tier and how many AI calls the local tiers saved.
+    """
+    import json
+
+    cascade = ClassificationCascade()
+    answered = {tier: {"answered": 0, "correct": 0} for tier in TIERS}
+    total = escalated = unresolved = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            example = json.loads(line)
+            total += 1
+            decision = cascade.classify_locally(example["text"], kb)
+            if decision["category"] is None:
+                escalated += 1
+                if classify is not None:
+                    decision = cascade.classify_with_ai(example["text"], kb, classify)
+            if decision["category"] is None:
+                unresolved += 1
+                continue
+            answered[decision["tier"]]["answered"] += 1
+            answered[decision["tier"]]["correct"] += decision["category"] == str(example["label"])
+
+    for counts in answered.values():
+        counts["accuracy"] = round(counts["correct"] / counts["answered"], 3) if counts["answered"] else None
+    correct = sum(counts["correct"] for counts in answered.values())
+    return {
+        "examples": total,
+        "accuracy": round(correct / total, 3) if total else None,
+        "unresolved": unresolved,
+        "ai_calls": escalated,
+        "ai_call_reduction": round(1 - escalated / total, 3) if total else None,
+        "tiers": {tier: {**answered[tier], **latency} for tier, latency in cascade.stats().items()}
+    }
+
+# Global instance
+cascade = ClassificationCascade()
+
+# Replay harness
+if __name__ == "__main__":
+    import sys
+    import json
+    from knowledge_base import knowledge_base
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    corpus = args[0] if args else os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "labeled_corpus.jsonl")
+    classify = None
+    if "--ai" in sys.argv:
+        from ai_helper import ai_helper
+        if ai_helper.is_enabled():
+            classify = ai_helper.classify_interest
+        else:
+            print("⚠️ AI not available; escalations are counted but not answered")
+
+    print(json.dumps(replay(corpus, knowledge_base.current(), classify), indent=2))
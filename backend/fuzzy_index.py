@@ -0,0 +1,99 @@
+"""
+Typo-tolerant vocabulary lookup for TechGuide Bot
+Character bigram index with bounded edit-distance verification.
+"""
+
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Tokens shorter than this are never corrected ("would" vs "world" is too risky)
+FUZZY_MIN_TOKEN_LENGTH = int(os.getenv("FUZZY_MIN_TOKEN_LENGTH", "6"))
+# Tokens at least this long may be two edits away from a vocabulary word
+FUZZY_LONG_TOKEN_LENGTH = int(os.getenv("FUZZY_LONG_TOKEN_LENGTH", "9"))
+
+def _bigrams(word: str) -> Set[str]:
+    padded = f"^{word}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions), giving up with ``limit + 1`` once it cannot be ≤ limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+class FuzzyIndex:
+    """
+    Maps a misspelled token to its closest vocabulary word.
+
+    Every word is split into padded character bigrams once, at build time.
+    A lookup only verifies the words that share enough bigrams with the
+    token to possibly be within the allowed distance (one edit changes at
+    most three bigrams), so the cost grows with the number of plausible
+    candidates rather than with the size of the vocabulary.
+    """
+
+    __slots__ = ("words", "_grams", "_postings")
+
+    def __init__(self, vocabulary: Iterable[str]):
+        self.words = frozenset(
+            word for word in vocabulary
+            if len(word) >= FUZZY_MIN_TOKEN_LENGTH - 1 and word.isalpha()
+        )
+        self._grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, List[str]] = defaultdict(list)
+        for word in sorted(self.words):
+            grams = _bigrams(word)
+            self._grams[word] = grams
+            for gram in grams:
+                self._postings[gram].append(word)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.words
+
+    @staticmethod
+    def max_distance(token: str) -> int:
+        if len(token) < FUZZY_MIN_TOKEN_LENGTH:
+            return 0
+        return 2 if len(token) >= FUZZY_LONG_TOKEN_LENGTH else 1
+
+    def lookup(self, token: str) -> Optional[Tuple[str, int]]:
+        """Closest vocabulary word as ``(word, distance)``, or None if nothing is close enough"""
+        limit = self.max_distance(token)
+        if limit == 0 or token in self.words or not token.isalpha():
+            return None
+
+        token_grams = _bigrams(token)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in token_grams:
+            for word in self._postings.get(gram, ()):
+                shared[word] += 1
+
+        best: Optional[Tuple[str, int]] = None
+        for word, count in shared.items():
+            if count < max(len(token_grams), len(self._grams[word])) - 3 * limit:
+                continue
+            distance = edit_distance(token, word, limit)
+            if distance > limit:
+                continue
+            if best is None or (distance, word) < (best[1], best[0]):
+                best = (word, distance)
+        return best
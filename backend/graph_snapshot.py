@@ -0,0 +1,173 @@
+"""
+Session graph snapshots for the Jac API
+Sessions and messages changed since the last flush are appended to a JSON
+lines log; restoring replays the log. A flush costs O(changes), never
+O(graph), and the log is compacted once it is mostly superseded records.
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+JAC_SNAPSHOT_PATH = os.getenv(
+    "JAC_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jac_sessions.jsonl")
+)
+# Seconds between background flushes (0 disables them; atexit still flushes)
+JAC_SNAPSHOT_INTERVAL = float(os.getenv("JAC_SNAPSHOT_INTERVAL", "30"))
+# Rewrite the log once it holds this many times more records than are live
+JAC_SNAPSHOT_COMPACT_RATIO = float(os.getenv("JAC_SNAPSHOT_COMPACT_RATIO", "4"))
+
+class SnapshotLog:
+    """
+    Dirty tracking plus an append-only record log.
+
+    ``session_changed`` only remembers the node; its record is built at
+    flush time, so a session touched many times between flushes is written
+    once. Messages never change after creation and are written exactly once.
+    Records are:
+
+        {"kind": "session", "session_id", "created_at", "message_count",
+         "first_seq", "user_interests", "recommendations"}
+        {"kind": "message", "session_id", "seq", "role", "content", "timestamp"}
+
+    On load a session keeps only messages with seq >= its first_seq, which
+    is how pruning survives a restart.
+    """
+
+    def __init__(self, path: str = JAC_SNAPSHOT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # Serializes appends and compaction (the background thread vs atexit)
+        self._io_lock = threading.Lock()
+        # session_id -> node exposing snapshot_record()
+        self._dirty: Dict[str, Any] = {}
+        self._messages: List[Dict[str, Any]] = []
+        # Records in the file, and the records a compacted file would hold
+        self._log_records = 0
+        self._live: Dict[str, int] = {}
+        self._started = False
+
+    def session_changed(self, session_id: str, node: Any):
+        with self._lock:
+            self._dirty[session_id] = node
+
+    def message_added(self, session_id: str, message: Dict[str, Any]):
+        with self._lock:
+            self._messages.append({"kind": "message", "session_id": session_id, **message})
+
+    def _write(self, records: List[Dict[str, Any]], mode: str, path: str):
+        with open(path, mode, encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def flush(self) -> int:
+        """Append everything changed since the last flush; returns the records written"""
+        with self._io_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            records, self._messages = self._messages, []
+        if not dirty and not records:
+            return 0
+        try:
+            sessions = [{"kind": "session", **node.snapshot_record()} for node in dirty.values()]
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._write(records + sessions, "a", self.path)
+        except Exception as e:
+            # Put the changes back so the next flush retries them, whatever failed
+            with self._lock:
+                for session_id, node in dirty.items():
+                    self._dirty.setdefault(session_id, node)
+                self._messages[:0] = records
+            logger.error(f"❌ Session snapshot failed: {e}")
+            return 0
+        for record in sessions:
+            self._live[record["session_id"]] = 1 + record["message_count"] - record["first_seq"]
+        records += sessions
+        self._log_records += len(records)
+        if self._log_records > JAC_SNAPSHOT_COMPACT_RATIO * max(sum(self._live.values()), 1):
+            self._compact()
+        return len(records)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """session_id -> session record with its surviving "messages" sorted by seq"""
+        sessions: Dict[str, Dict[str, Any]] = {}
+        messages: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        records = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from a crash mid-append
+                        continue
+                    records += 1
+                    session_id = record.get("session_id")
+                    if record.get("kind") == "session":
+                        sessions[session_id] = record
+                    elif record.get("kind") == "message":
+                        messages.setdefault(session_id, {})[record["seq"]] = record
+        except FileNotFoundError:
+            return {}
+
+        for session_id, session in sessions.items():
+            first_seq = session.get("first_seq", 0)
+            kept = messages.get(session_id, {})
+            session["messages"] = [kept[seq] for seq in sorted(kept) if seq >= first_seq]
+            self._live[session_id] = 1 + len(session["messages"])
+        self._log_records = records
+        return sessions
+
+    def compact(self):
+        """Rewrite the log with only the live records (atomic rename)"""
+        with self._io_lock:
+            self._compact()
+
+    def _compact(self):
+        sessions = self.load()
+        records = []
+        for session in sessions.values():
+            records.extend(session.pop("messages"))
+            records.append(session)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            self._write(records, "w", tmp_path)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"❌ Session snapshot compaction failed: {e}")
+            return
+        self._log_records = len(records)
+        logger.info(f"📦 Compacted session snapshot to {len(records)} records")
+
+    def start(self, interval: float = JAC_SNAPSHOT_INTERVAL):
+        """Flush every ``interval`` seconds from a daemon thread, and once at exit"""
+        if self._started:
+            return
+        self._started = True
+        atexit.register(self.flush)
+        if interval <= 0:
+            return
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"❌ Session snapshot failed: {e}")
+
+        threading.Thread(target=run, name="jac-snapshot", daemon=True).start()
+
+# Global instance
+snapshot_log = SnapshotLog()
@@ -0,0 +1,108 @@
+"""
+Health probing for TechGuide Bot
+A background prober measures dependencies and event-loop lag on an
+interval; /readyz only reads its cached results.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+# How often the loop-lag sampler wakes up, and the lag above which we are not ready
+LOOP_LAG_SAMPLE_INTERVAL = float(os.getenv("LOOP_LAG_SAMPLE_INTERVAL", "0.5"))
+READY_MAX_LOOP_LAG_MS = float(os.getenv("READY_MAX_LOOP_LAG_MS", "500"))
+# Checks named here only degrade readiness details, they never make /readyz fail
+HEALTH_OPTIONAL_CHECKS = {
+    name.strip() for name in os.getenv("HEALTH_OPTIONAL_CHECKS", "").split(",") if name.strip()
+}
+
+class HealthProber:
+    """
+    Runs every registered check in the threadpool with a timeout, once per
+    interval, and keeps the last outcome of each. A separate sampler
+    measures how late the event loop wakes up from short sleeps.
+
+    A check is a blocking callable returning a dict of details; raising
+    (or timing out) marks it failed.
+    """
+
+    def __init__(self, interval: float = HEALTH_PROBE_INTERVAL):
+        self.interval = interval
+        self._checks: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.loop_lag_ms = 0.0
+        self.max_loop_lag_ms = 0.0
+        self.last_probe = 0.0
+
+    def add_check(self, name: str, check: Callable[[], Dict[str, Any]]):
+        self._checks[name] = check
+
+    async def _run_check(self, name: str, check: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(run_in_threadpool(check), HEALTH_PROBE_TIMEOUT)
+            ok = details.pop("ok", True)
+            outcome = {"ok": ok, **details}
+        except asyncio.TimeoutError:
+            outcome = {"ok": False, "error": f"timed out after {HEALTH_PROBE_TIMEOUT}s"}
+        except Exception as e:
+            outcome = {"ok": False, "error": str(e)[:200]}
+        outcome["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        outcome["checked_at"] = datetime.now().isoformat()
+        if self.results.get(name, {}).get("ok", True) != outcome["ok"]:
+            log = logger.info if outcome["ok"] else logger.warning
+            log(f"{'✅' if outcome['ok'] else '⚠️'} Health check {name}: {'ok' if outcome['ok'] else outcome.get('error')}")
+        return outcome
+
+    async def probe_once(self):
+        names = list(self._checks)
+        outcomes = await asyncio.gather(*(self._run_check(name, self._checks[name]) for name in names))
+        self.results = dict(zip(names, outcomes))
+        self.last_probe = time.time()
+
+    async def run(self):
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self.interval)
+
+    async def sample_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_LAG_SAMPLE_INTERVAL
+            await asyncio.sleep(LOOP_LAG_SAMPLE_INTERVAL)
+            self.loop_lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            # Decaying peak so one stall shows up for a while, then fades
+            self.max_loop_lag_ms = max(self.loop_lag_ms, self.max_loop_lag_ms * 0.9)
+
+    def readiness(self) -> Dict[str, Any]:
+        """Cached verdict; never calls a dependency"""
+        reasons = []
+        if not self.last_probe:
+            reasons.append("not probed yet")
+        elif time.time() - self.last_probe > 3 * self.interval + HEALTH_PROBE_TIMEOUT:
+            reasons.append("probe results are stale")
+        for name, outcome in self.results.items():
+            if not outcome["ok"] and name not in HEALTH_OPTIONAL_CHECKS:
+                reasons.append(f"{name} failing")
+        if self.max_loop_lag_ms > READY_MAX_LOOP_LAG_MS:
+            reasons.append(f"event loop lag {self.max_loop_lag_ms:.0f}ms")
+        return {
+            "ready": not reasons,
+            "reasons": reasons,
+            "checks": self.results,
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+            "max_loop_lag_ms": round(self.max_loop_lag_ms, 1),
+            "last_probe": datetime.fromtimestamp(self.last_probe).isoformat() if self.last_probe else None
+        }
+
+# Global instance
+prober = HealthProber()
@@ -0,0 +1,114 @@
+"""
+Idempotency keys for TechGuide Bot
+A retried POST carrying the same Idempotency-Key gets the first attempt's
+result instead of running the turn (and its AI call) again.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict, deque
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+
+# Seconds a completed result is replayed for
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "300"))
+# Most keys remembered at once (oldest are evicted first)
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request body"""
+
+class IdempotencyEntry:
+    __slots__ = ("fingerprint", "task", "expires_at")
+
+    def __init__(self, fingerprint: str, task: "asyncio.Task"):
+        self.fingerprint = fingerprint
+        self.task = task
+        # Set once the task succeeds; in-flight entries never expire
+        self.expires_at: Optional[float] = None
+
+def fingerprint(*fields: Any) -> str:
+    """Hash of the request fields a key is bound to"""
+    return hashlib.sha256(repr(fields).encode("utf-8")).hexdigest()
+
+class IdempotencyCache:
+    """
+    Results keyed by (endpoint, Idempotency-Key), bounded and TTL-expired.
+
+    Every entry holds the asyncio task computing its result. A duplicate
+    that arrives mid-flight awaits the same task; one that arrives later
+    reads its result. Callers await the task through asyncio.shield, so a
+    client that disconnects does not cancel the turn its retry will want.
+    Failed tasks are dropped so the next retry recomputes. Completed
+    entries are also queued in completion order, which with one TTL is
+    expiry order: expired ones go first, then the oldest completed, and an
+    in-flight entry only when nothing else is left. Only touched from the
+    event loop, so no lock is needed.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[Tuple[str, str], IdempotencyEntry]" = OrderedDict()
+        # (expires_at, cache key, entry) per completed entry, oldest first; may hold removed entries
+        self._completed: deque = deque()
+        self.stats_counters = {"computed": 0, "replayed": 0, "attached": 0, "conflicts": 0}
+
+    def _drop_completed(self):
+        _, cache_key, entry = self._completed.popleft()
+        if self._entries.get(cache_key) is entry:
+            del self._entries[cache_key]
+
+    def _prune(self, now: float):
+        while self._completed and self._completed[0][0] <= now:
+            self._drop_completed()
+        while len(self._entries) > self.max_keys and self._completed:
+            self._drop_completed()
+        while len(self._entries) > self.max_keys:
+            # Only in-flight entries are left; an evicted task still finishes for the callers awaiting it
+            self._entries.popitem(last=False)
+
+    async def run(self, endpoint: str, key: str, request_fingerprint: str,
+                  compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        """(result, replayed): ``compute`` runs once per live key"""
+        now = time.time()
+        cache_key = (endpoint, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= now:
+            del self._entries[cache_key]
+            entry = None
+
+        if entry is not None:
+            if entry.fingerprint != request_fingerprint:
+                self.stats_counters["conflicts"] += 1
+                raise IdempotencyConflict(key)
+            self.stats_counters["replayed" if entry.task.done() else "attached"] += 1
+            return await asyncio.shield(entry.task), True
+
+        task = asyncio.ensure_future(compute())
+        entry = IdempotencyEntry(request_fingerprint, task)
+        self._entries[cache_key] = entry
+        self.stats_counters["computed"] += 1
+        task.add_done_callback(lambda done: self._finished(cache_key, entry, done))
+        self._prune(now)
+        return await asyncio.shield(task), False
+
+    def _finished(self, cache_key: Tuple[str, str], entry: IdempotencyEntry, task: "asyncio.Task"):
+        if task.cancelled() or task.exception() is not None:
+            if self._entries.get(cache_key) is entry:
+                del self._entries[cache_key]
+            return
+        if self._entries.get(cache_key) is entry:
+            entry.expires_at = time.time() + self.ttl
+            self._completed.append((entry.expires_at, cache_key, entry))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": len(self._entries), "ttl_seconds": self.ttl, **self.stats_counters}
+
+# Global instance
+idempotency = IdempotencyCache()
@@ -0,0 +1,312 @@
+"""
+Knowledge base for TechGuide Bot
+Loads categories, resources and keywords from data/knowledge_base.json
+into an immutable in-memory structure that can be hot-reloaded.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+from fuzzy_index import FuzzyIndex
+
+logger = logging.getLogger(__name__)
+
+KB_PATH = os.getenv(
+    "KB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "knowledge_base.json")
+)
+SUPPORTED_SCHEMA_VERSION = 1
+# Previous versions kept after a reload, so stored messages can still be rehydrated
+KB_RETAINED_VERSIONS = int(os.getenv("KB_RETAINED_VERSIONS", "5"))
+
+# Scoring weights: whole-word hit, typo-corrected hit, plain substring hit
+EXACT_WEIGHT = 3
+FUZZY_WEIGHT = int(os.getenv("FUZZY_WEIGHT", "2"))
+SUBSTRING_WEIGHT = 1
+FUZZY_MATCHING = os.getenv("FUZZY_MATCHING", "true").lower() == "true"
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+# ============================================================================
+# DATA STRUCTURES
+# ============================================================================
+
+@dataclass(frozen=True, slots=True)
+class Category:
+    """One technology category (a recommendation target)"""
+    id: str
+    lang: str
+    reason: str
+    difficulty: str
+    time: str
+    learning_path: Tuple[Dict[str, Any], ...]
+    career_paths: Tuple[str, ...]
+    resources: Tuple[str, ...]
+    keywords: Tuple[str, ...]
+
+class KnowledgeBase:
+    """
+    Immutable view of one version of the knowledge base.
+
+    The keyword index is flattened at load time into
+    ``(keyword, " keyword ", category_id)`` tuples so scoring is a single
+    pass with no per-request string building for the keywords. The words
+    of all keywords also feed a FuzzyIndex used to correct typos.
+    """
+
+    __slots__ = ("version", "categories", "keyword_index", "fuzzy", "_snapshot", "_legacy")
+
+    def __init__(self, categories: Dict[str, Category], version: str):
+        self.version = version
+        self.categories = categories
+        self.keyword_index = tuple(
+            (keyword, f" {keyword} ", category.id)
+            for category in categories.values()
+            for keyword in category.keywords
+        )
+        self.fuzzy = FuzzyIndex({
+            word
+            for category in categories.values()
+            for keyword in category.keywords
+            for word in keyword.split()
+        })
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._legacy: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def get(self, category_id: str) -> Optional[Category]:
+        return self.categories.get(category_id)
+
+    def score(self, text: str) -> Dict[str, int]:
+        """Keyword scores per category (see ``classify`` for the weights)"""
+        return self.classify(text)["scores"]
+
+    def classify(self, text: str, fuzzy: bool = FUZZY_MATCHING) -> Dict[str, Any]:
+        """
+        Score every category against ``text``.
+
+        Whole-word keyword hits weigh 3 and substring hits 1. Keywords that
+        only appear once misspelled words are corrected through the fuzzy
+        index weigh ``FUZZY_WEIGHT`` and are listed in ``fuzzy_matches``;
+        ``fuzzy=False`` skips that step.
+        """
+        text_lower = text.lower()
+        tokens = _TOKEN_RE.findall(text_lower)
+        # Word boundaries: punctuation counts as a space ("unity!" is a whole-word hit)
+        padded = f" {' '.join(tokens)} "
+        scores = dict.fromkeys(self.categories, 0)
+        matched: List[str] = []
+        for keyword, padded_keyword, category_id in self.keyword_index:
+            if keyword in text_lower:
+                if padded_keyword in padded:
+                    scores[category_id] += EXACT_WEIGHT
+                else:
+                    scores[category_id] += SUBSTRING_WEIGHT
+                matched.append(keyword)
+
+        classification = {"scores": scores, "matched_keywords": matched, "fuzzy_matches": []}
+        return self.add_fuzzy(text, classification) if fuzzy else classification
+
+    def add_fuzzy(self, text: str, exact: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        ``exact`` (the ``classify(text, fuzzy=False)`` result) plus the hits
+        of typo-corrected words, without scoring the exact keywords again.
+        ``exact`` itself is left unchanged.
+        """
+        tokens = _TOKEN_RE.findall(text.lower())
+        corrections: Dict[str, Tuple[str, int]] = {}
+        for token in tokens:
+            if token not in corrections:
+                hit = self.fuzzy.lookup(token)
+                if hit is not None:
+                    corrections[token] = hit
+        scores = dict(exact["scores"])
+        fuzzy_matches: List[Dict[str, Any]] = []
+        if corrections:
+            fuzzy_matches = self._score_corrections(tokens, corrections, exact["matched_keywords"], scores)
+        return {"scores": scores, "matched_keywords": exact["matched_keywords"], "fuzzy_matches": fuzzy_matches}
+
+    def _score_corrections(self, tokens: List[str], corrections: Dict[str, Tuple[str, int]],
+                           matched: List[str], scores: Dict[str, int]) -> List[Dict[str, Any]]:
+        corrected_words = {word for word, _ in corrections.values()}
+        corrected = " " + " ".join(corrections[t][0] if t in corrections else t for t in tokens) + " "
+        already_matched = set(matched)
+        used_words = set()
+        for keyword, padded_keyword, category_id in self.keyword_index:
+            if keyword in already_matched or padded_keyword not in corrected:
+                continue
+            words = set(keyword.split()) & corrected_words
+            if not words:
+                continue
+            scores[category_id] += FUZZY_WEIGHT
+            used_words |= words
+        return [
+            {"token": token, "keyword": word, "distance": distance}
+            for token, (word, distance) in corrections.items()
+            if word in used_words
+        ]
+
+    def recommendation(self, category_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """Recommendation payload in the shape returned by the API"""
+        category = self.categories.get(category_id)
+        if category is None:
+            return None
+        return {
+            "status": "ok",
+            "language": category.lang,
+            "reason": category.reason,
+            "resources": list(category.resources),
+            "metadata": {
+                "difficulty": category.difficulty,
+                "estimated_time": category.time,
+                "learning_path": list(category.learning_path),
+                "career_paths": list(category.career_paths),
+                "session_id": session_id,
+                "category_id": category.id,
+                "kb_version": self.version
+            },
+            "type": "recommendation"
+        }
+
+    def _legacy_maps(self) -> Dict[str, Dict[str, Any]]:
+        if self._legacy is None:
+            self._legacy = {
+                "interest_map": {
+                    c.id: {
+                        "lang": c.lang,
+                        "reason": c.reason,
+                        "difficulty": c.difficulty,
+                        "time": c.time,
+                        "learning_path": list(c.learning_path),
+                        "career_paths": list(c.career_paths)
+                    }
+                    for c in self.categories.values()
+                },
+                "resources_map": {c.lang: list(c.resources) for c in self.categories.values()},
+                "keywords": {c.id: list(c.keywords) for c in self.categories.values()}
+            }
+        return self._legacy
+
+    def interest_map(self) -> Dict[str, Any]:
+        return self._legacy_maps()["interest_map"]
+
+    def resources_map(self) -> Dict[str, Any]:
+        return self._legacy_maps()["resources_map"]
+
+    def keywords(self) -> Dict[str, Any]:
+        return self._legacy_maps()["keywords"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Compact serialized copy for clients, built once per version"""
+        if self._snapshot is None:
+            body = json.dumps({"version": self.version, **self._legacy_maps()}, separators=(",", ":"))
+            self._snapshot = {"version": self.version, "body": body.encode("utf-8")}
+        return self._snapshot
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def parse_knowledge_base(raw: bytes) -> KnowledgeBase:
+    """Validate raw JSON and build a KnowledgeBase; raises ValueError on bad data"""
+    try:
+        document = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Knowledge base is not valid JSON: {e}")
+
+    schema = document.get("schema_version")
+    if schema != SUPPORTED_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported knowledge base schema_version: {schema}")
+
+    categories = {}
+    for category_id, data in document.get("categories", {}).items():
+        try:
+            categories[category_id] = Category(
+                id=category_id,
+                lang=data["lang"],
+                reason=data["reason"],
+                difficulty=data["difficulty"],
+                time=data["time"],
+                learning_path=tuple(data.get("learning_path", [])),
+                career_paths=tuple(data.get("career_paths", [])),
+                resources=tuple(data.get("resources", [])),
+                keywords=tuple(keyword.lower() for keyword in data.get("keywords", []))
+            )
+        except KeyError as e:
+            raise ValueError(f"Category {category_id} is missing field {e}")
+
+    if not categories:
+        raise ValueError("Knowledge base has no categories")
+
+    version = hashlib.sha256(raw).hexdigest()[:16]
+    return KnowledgeBase(categories, version)
+
+def load_knowledge_base(path: str = KB_PATH) -> KnowledgeBase:
+    with open(path, "rb") as f:
+        return parse_knowledge_base(f.read())
+
+class KnowledgeBaseStore:
+    """
+    Holds the current KnowledgeBase and swaps it atomically on reload.
+
+    Readers call ``current()`` once per request and keep that reference, so
+    a reload never changes the data under a request that is already running.
+    """
+
+    def __init__(self, path: str = KB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = os.path.getmtime(path)
+        self._current = load_knowledge_base(path)
+        self._retained: "OrderedDict[str, KnowledgeBase]" = OrderedDict()
+        logger.info(f"📚 Knowledge base loaded: {len(self._current.categories)} categories (version {self._current.version})")
+
+    def current(self) -> KnowledgeBase:
+        return self._current
+
+    def get_version(self, version: Optional[str]) -> KnowledgeBase:
+        """The given version if it is current or still retained, else the current one"""
+        current = self._current
+        if version is None or version == current.version:
+            return current
+        return self._retained.get(version, current)
+
+    def reload(self) -> bool:
+        """Reload from disk; returns True if the content changed. Raises ValueError on bad data."""
+        with self._lock:
+            # Record the mtime first so a broken file is reported once, not on every poll
+            self._mtime = os.path.getmtime(self.path)
+            new_kb = load_knowledge_base(self.path)
+            if new_kb.version == self._current.version:
+                return False
+            old_version = self._current.version
+            self._retained[old_version] = self._current
+            while len(self._retained) > KB_RETAINED_VERSIONS:
+                self._retained.popitem(last=False)
+            self._current = new_kb
+        logger.info(f"📚 Knowledge base reloaded: {old_version} -> {new_kb.version}")
+        return True
+
+    def reload_if_modified(self) -> bool:
+        """Cheap check for the file watcher: only reparse when the mtime moved"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Knowledge base file not readable: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            return self.reload()
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Knowledge base reload failed, keeping {self._current.version}: {e}")
+            return False
+
+# Global instance
+knowledge_base = KnowledgeBaseStore()
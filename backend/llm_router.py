@@ -0,0 +1,407 @@
+"""
+LLM provider routing for TechGuide Bot
+Keeps a rolling latency and error profile per configured model and sends
+each call to the fastest healthy one, optionally hedging slow calls with a
+second provider.
+
+Simulate routing offline with stub providers:
+    LLM_MODELS="stub/fast:0.05:0,stub/flaky:0.02:0.3,stub/slow:0.4:0" python llm_router.py 200
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+import contextvars
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated models: litellm names ("gemini/gemini-2.0-flash", "openai/gpt-4o-mini")
+# or offline stubs "stub/<name>:<mean latency s>:<error rate>". Empty: the Gemini SDK model only
+LLM_MODELS = os.getenv("LLM_MODELS", "")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+# Calls per provider kept for the latency percentiles and the error rate
+LLM_PROFILE_WINDOW = int(os.getenv("LLM_PROFILE_WINDOW", "100"))
+# A provider is skipped for LLM_COOLDOWN_SECONDS after LLM_MAX_CONSECUTIVE_FAILURES
+# failures in a row, or when its error rate over the last 10+ calls passes LLM_MAX_ERROR_RATE
+LLM_MAX_ERROR_RATE = float(os.getenv("LLM_MAX_ERROR_RATE", "0.5"))
+LLM_MAX_CONSECUTIVE_FAILURES = int(os.getenv("LLM_MAX_CONSECUTIVE_FAILURES", "3"))
+LLM_COOLDOWN_SECONDS = float(os.getenv("LLM_COOLDOWN_SECONDS", "30"))
+# Share of calls sent to a random healthy provider so stale profiles get refreshed
+LLM_EXPLORE_RATE = float(os.getenv("LLM_EXPLORE_RATE", "0.05"))
+# Hedging: once the primary runs past its p95, also ask the next provider and take the first answer.
+# Needs LLM_HEDGE_MIN_SAMPLES latencies on the primary before its p95 is trusted
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", "8"))
+
+# ============================================================================
+# PROVIDERS
+# ============================================================================
+
+class Provider(ABC):
+    """
+    One model endpoint. complete() and stream() raise on failure;
+    ``max_tokens`` caps the answer length when set.
+    """
+
+    name = "provider"
+
+    @abstractmethod
+    def complete(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """The model's answer to ``prompt``"""
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        yield self.complete(prompt)
+
+    def ping(self):
+        self.complete("ping")
+
+class GeminiProvider(Provider):
+    """A google-generativeai GenerativeModel (the original single-model setup)"""
+
+    def __init__(self, model, name: str):
+        self.model = model
+        self.name = name
+
+    def complete(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        if max_tokens:
+            return self.model.generate_content(prompt, generation_config={"max_output_tokens": max_tokens}).text
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+    def ping(self):
+        # Token counting authenticates without generating anything
+        self.model.count_tokens("ping")
+
+class LiteLLMProvider(Provider):
+    """Any model litellm can reach; API keys come from its usual env variables"""
+
+    def __init__(self, model: str):
+        import litellm
+        self._litellm = litellm
+        self.name = model
+
+    def _messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [{"role": "user", "content": prompt}]
+
+    def complete(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        response = self._litellm.completion(
+            model=self.name, messages=self._messages(prompt), timeout=LLM_TIMEOUT, max_tokens=max_tokens
+        )
+        return response.choices[0].message.content or ""
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        response = self._litellm.completion(
+            model=self.name, messages=self._messages(prompt), timeout=LLM_TIMEOUT, stream=True
+        )
+        for chunk in response:
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+
+    def ping(self):
+        self._litellm.completion(model=self.name, messages=self._messages("ping"), max_tokens=1, timeout=LLM_TIMEOUT)
+
+class StubProvider(Provider):
+    """
+    Offline stand-in: sleeps an exponentially distributed time (so there is
+    a latency tail to hedge) and fails ``error_rate`` of the calls.
+    """
+
+    def __init__(self, name: str, mean_latency: float = 0.05, error_rate: float = 0.0):
+        self.name = name
+        self.mean_latency = mean_latency
+        self.error_rate = error_rate
+
+    def complete(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        time.sleep(random.expovariate(1 / self.mean_latency) if self.mean_latency > 0 else 0)
+        if random.random() < self.error_rate:
+            raise RuntimeError(f"{self.name} failed")
+        if "Respond with ONLY valid JSON" in prompt:
+            return '{"category": "2", "language": "Python", "confidence": 0.9, "reasoning": "stub", "alternative": ""}'
+        text = f"[{self.name}] {prompt[-80:]}"
+        # Roughly four characters per token
+        return text[:max_tokens * 4] if max_tokens else text
+
+def parse_stub(spec: str) -> StubProvider:
+    """"stub/<name>:<mean latency s>:<error rate>" (the last two are optional)"""
+    parts = spec.split(":")
+    return StubProvider(
+        parts[0],
+        float(parts[1]) if len(parts) > 1 and parts[1] else 0.05,
+        float(parts[2]) if len(parts) > 2 and parts[2] else 0.0
+    )
+
+def build_providers(spec: str = LLM_MODELS, default: Optional[Provider] = None) -> List[Provider]:
+    """Providers named in ``spec``; models that cannot be set up are skipped with a warning"""
+    providers: List[Provider] = []
+    for name in (part.strip() for part in spec.split(",")):
+        if not name:
+            continue
+        try:
+            providers.append(parse_stub(name) if name.startswith("stub/") else LiteLLMProvider(name))
+        except Exception as e:
+            logger.warning(f"⚠️ LLM provider {name} unavailable: {e}")
+    if not providers and default is not None:
+        providers.append(default)
+    return providers
+
+# ============================================================================
+# ROUTER
+# ============================================================================
+
+class ProviderProfile:
+    __slots__ = ("latencies", "outcomes", "calls", "failures", "consecutive_failures",
+                 "cooldown_until", "hedges_won")
+
+    def __init__(self, window: int = LLM_PROFILE_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.hedges_won = 0
+
+    def record(self, latency_ms: float, ok: bool, now: float):
+        self.calls += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency_ms)
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if (self.consecutive_failures >= LLM_MAX_CONSECUTIVE_FAILURES
+                    or (len(self.outcomes) >= 10 and self.error_rate() > LLM_MAX_ERROR_RATE)):
+                self.cooldown_until = now + LLM_COOLDOWN_SECONDS
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * q), len(latencies) - 1)]
+
+    def error_rate(self) -> float:
+        return 1 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def expected_ms(self) -> float:
+        """p50 inflated by the retries its error rate implies; untried providers go first"""
+        p50 = self.percentile(0.5)
+        if p50 is None:
+            return 0.0
+        return p50 / max(1 - self.error_rate(), 0.05)
+
+class LLMRouter:
+    """
+    Orders providers by expected latency (unhealthy ones last) and fails
+    over down that list. With hedging, a second provider is started once
+    the first has run past its own p95; the first success wins.
+    """
+
+    def __init__(self, providers: List[Provider], hedge: bool = LLM_HEDGE):
+        self.providers = providers
+        self.hedge = hedge
+        self._lock = threading.Lock()
+        self._profiles = {provider.name: ProviderProfile() for provider in providers}
+        self.hedged_calls = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _record(self, provider: Provider, started: float, ok: bool):
+        now = time.time()
+        with self._lock:
+            self._profiles[provider.name].record((time.perf_counter() - started) * 1000, ok, now)
+
+    def ranked(self, explore: bool = True) -> List[Provider]:
+        """Best provider first; ``explore`` lets LLM_EXPLORE_RATE of the calls try a random healthy one"""
+        now = time.time()
+        with self._lock:
+            scored = [
+                (not self._profiles[p.name].healthy(now), self._profiles[p.name].expected_ms(), i, p)
+                for i, p in enumerate(self.providers)
+            ]
+        ranked = [p for *_, p in sorted(scored, key=lambda item: item[:3])]
+        healthy = [p for unhealthy, _, _, p in scored if not unhealthy]
+        if explore and len(healthy) > 1 and random.random() < LLM_EXPLORE_RATE:
+            explored = random.choice(healthy)
+            ranked.remove(explored)
+            ranked.insert(0, explored)
+        return ranked
+
+    def _call(self, provider: Provider, prompt: str, max_tokens: Optional[int] = None) -> str:
+        started = time.perf_counter()
+        try:
+            text = provider.complete(prompt, max_tokens)
+        except Exception:
+            self._record(provider, started, False)
+            raise
+        self._record(provider, started, True)
+        return text
+
+    def _hedge_delay(self, provider: Provider) -> Optional[float]:
+        """Seconds to wait on ``provider`` before hedging; None when its p95 is not known yet"""
+        with self._lock:
+            profile = self._profiles[provider.name]
+            if len(profile.latencies) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            return profile.percentile(0.95) / 1000
+
+    def _submit(self, provider: Provider, prompt: str, max_tokens: Optional[int]):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(LLM_HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+        # Copy the context so spans and request ids follow the call into the pool
+        return self._executor.submit(contextvars.copy_context().run, self._call, provider, prompt, max_tokens)
+
+    def _hedged(self, primary: Provider, backup: Provider, prompt: str, delay: float,
+                max_tokens: Optional[int] = None, tried: Optional[Set[str]] = None) -> Tuple[str, str, bool]:
+        """The first answer of ``primary`` or, past ``delay``, ``backup``; adds backup to ``tried`` once called"""
+        pending = {self._submit(primary, prompt, max_tokens): primary}
+        done, _ = wait(pending, timeout=delay)
+        hedged = not done
+        if hedged:
+            if tried is not None:
+                tried.add(backup.name)
+            with self._lock:
+                self.hedged_calls += 1
+            pending[self._submit(backup, prompt, max_tokens)] = backup
+        error: Optional[Exception] = None
+        while pending:
+            done, _ = wait(pending, timeout=LLM_TIMEOUT, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                # The slower call keeps running in the pool; its outcome still updates its profile
+                if provider is backup:
+                    with self._lock:
+                        self._profiles[backup.name].hedges_won += 1
+                return text, provider.name, hedged
+        raise error or TimeoutError("No provider answered in time")
+
+    def complete(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        {"text", "provider", "attempts", "hedged"} from the first provider
+        that answers; raises the last error when all of them fail.
+        """
+        ranked = self.ranked()
+        if not ranked:
+            raise RuntimeError("No LLM providers configured")
+        error: Optional[Exception] = None
+        # Providers already called in this request, hedge backups included; never called twice
+        tried: Set[str] = set()
+        attempt = 0
+        for provider in ranked:
+            if provider.name in tried:
+                continue
+            tried.add(provider.name)
+            attempt += 1
+            untried = [p for p in ranked if p.name not in tried]
+            backup = untried[0] if self.hedge and untried else None
+            delay = self._hedge_delay(provider) if backup is not None else None
+            try:
+                if delay is None:
+                    text, name, hedged = self._call(provider, prompt, max_tokens), provider.name, False
+                else:
+                    text, name, hedged = self._hedged(provider, backup, prompt, delay, max_tokens, tried)
+                return {"text": text, "provider": name, "attempts": attempt, "hedged": hedged}
+            except Exception as e:
+                error = e
+                logger.warning(f"⚠️ LLM provider {provider.name} failed: {e}")
+        raise error
+
+    def stream(self, prompt: str, info: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Stream from the best provider; its name is put in ``info["provider"]``.
+        Failover only happens before the first chunk; streams are never
+        hedged because two cannot be merged.
+        """
+        error: Optional[Exception] = None
+        for provider in self.ranked():
+            if info is not None:
+                info["provider"] = provider.name
+            started = time.perf_counter()
+            produced = False
+            try:
+                for text in provider.stream(prompt):
+                    produced = True
+                    yield text
+            except Exception as e:
+                self._record(provider, started, False)
+                if produced:
+                    raise
+                error = e
+                logger.warning(f"⚠️ LLM provider {provider.name} failed: {e}")
+                continue
+            self._record(provider, started, True)
+            return
+        if error is not None:
+            raise error
+
+    def ping(self) -> Dict[str, Any]:
+        # The provider calls would go to, never a random exploration pick
+        provider = self.ranked(explore=False)[0]
+        provider.ping()
+        return {"reachable": True, "provider": provider.name}
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            providers = {}
+            for provider in self.providers:
+                profile = self._profiles[provider.name]
+                p50, p95 = profile.percentile(0.5), profile.percentile(0.95)
+                providers[provider.name] = {
+                    "healthy": profile.healthy(now),
+                    "calls": profile.calls,
+                    "failures": profile.failures,
+                    "error_rate": round(profile.error_rate(), 3),
+                    "p50_ms": round(p50, 1) if p50 is not None else None,
+                    "p95_ms": round(p95, 1) if p95 is not None else None,
+                    "hedges_won": profile.hedges_won
+                }
+            return {"hedging": self.hedge, "hedged_calls": self.hedged_calls, "providers": providers}
+
+# Offline routing simulation
+if __name__ == "__main__":
+    import sys
+    import json
+
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    router = LLMRouter(build_providers(LLM_MODELS or "stub/fast:0.05:0,stub/flaky:0.02:0.3,stub/slow:0.4:0"))
+    served: Dict[str, int] = {}
+    failed = 0
+    started = time.perf_counter()
+    for _ in range(calls):
+        try:
+            name = router.complete("Which language should I learn?")["provider"]
+            served[name] = served.get(name, 0) + 1
+        except Exception:
+            failed += 1
+    print(json.dumps({
+        "calls": calls,
+        "failed": failed,
+        "served_by": served,
+        "seconds": round(time.perf_counter() - started, 2),
+        **router.stats()
+    }, indent=2))
@@ -0,0 +1,235 @@
+"""
+Local interest classifier for TechGuide Bot
+Multinomial naive Bayes over hashed word features, trained incrementally
+from AI classifications and user-confirmed recommendations.
+"""
+
+import os
+import re
+import gzip
+import json
+import math
+import zlib
+import logging
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOCAL_MODEL_PATH = os.getenv(
+    "LOCAL_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "local_model.json.gz")
+)
+# Hash space for word unigrams and bigrams
+LOCAL_MODEL_FEATURES = 2 ** int(os.getenv("LOCAL_MODEL_FEATURE_BITS", "18"))
+# Predictions are only used once the model has seen this many labeled examples...
+LOCAL_MODEL_MIN_EXAMPLES = int(os.getenv("LOCAL_MODEL_MIN_EXAMPLES", "50"))
+# ...and only when the winning class has at least this posterior probability
+LOCAL_MODEL_MIN_CONFIDENCE = float(os.getenv("LOCAL_MODEL_MIN_CONFIDENCE", "0.8"))
+# AI classifications below this self-reported confidence are not learned from
+LOCAL_MODEL_MIN_AI_CONFIDENCE = float(os.getenv("LOCAL_MODEL_MIN_AI_CONFIDENCE", "0.6"))
+MODEL_FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+def hashed_features(text: str, n_features: int = LOCAL_MODEL_FEATURES) -> List[int]:
+    """Word unigrams and bigrams hashed with crc32 (stable across processes, unlike hash())"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(gram.encode("utf-8")) % n_features for gram in grams]
+
+class NaiveBayesModel:
+    """
+    Sparse multinomial naive Bayes with Laplace smoothing.
+
+    Per class it keeps a document count, a feature total and a dict of
+    feature counts, so learning one example is O(features in the text) and
+    prediction is O(features × classes) dict lookups. Not thread-safe; see
+    LocalClassifier.
+    """
+
+    __slots__ = ("n_features", "docs", "totals", "counts", "vocabulary", "seeded")
+
+    def __init__(self, n_features: int = LOCAL_MODEL_FEATURES):
+        self.n_features = n_features
+        self.docs: Dict[str, int] = {}
+        self.totals: Dict[str, int] = {}
+        self.counts: Dict[str, Dict[int, int]] = {}
+        self.vocabulary = set()
+        # Examples that came from seeding rather than real labels
+        self.seeded = 0
+
+    @property
+    def examples(self) -> int:
+        return sum(self.docs.values())
+
+    @property
+    def trained_examples(self) -> int:
+        return self.examples - self.seeded
+
+    def learn(self, text: str, label: str) -> bool:
+        features = hashed_features(text, self.n_features)
+        if not features:
+            return False
+        counts = self.counts.setdefault(label, {})
+        for feature in features:
+            counts[feature] = counts.get(feature, 0) + 1
+        self.vocabulary.update(features)
+        self.docs[label] = self.docs.get(label, 0) + 1
+        self.totals[label] = self.totals.get(label, 0) + len(features)
+        return True
+
+    def predict(self, text: str) -> Dict[str, float]:
+        """Posterior probability per known label (empty if nothing is known yet)"""
+        features = hashed_features(text, self.n_features)
+        if not self.docs or not features:
+            return {}
+        n_docs = self.examples
+        vocabulary_size = len(self.vocabulary) + 1
+        log_scores = {}
+        for label, docs in self.docs.items():
+            counts = self.counts[label]
+            denominator = math.log(self.totals[label] + vocabulary_size)
+            score = math.log(docs / n_docs)
+            for feature in features:
+                score += math.log(counts.get(feature, 0) + 1) - denominator
+            log_scores[label] = score
+        top = max(log_scores.values())
+        exp_scores = {label: math.exp(score - top) for label, score in log_scores.items()}
+        norm = sum(exp_scores.values())
+        return {label: value / norm for label, value in exp_scores.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": MODEL_FORMAT_VERSION,
+            "n_features": self.n_features,
+            "seeded": self.seeded,
+            "classes": {
+                label: {
+                    "docs": self.docs[label],
+                    "total": self.totals[label],
+                    # Flat [feature, count, feature, count, ...] is about half the size of a dict
+                    "counts": [value for item in self.counts[label].items() for value in item]
+                }
+                for label in self.docs
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NaiveBayesModel":
+        if data.get("format") != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported local model format: {data.get('format')}")
+        model = cls(int(data["n_features"]))
+        model.seeded = int(data.get("seeded", 0))
+        for label, entry in data["classes"].items():
+            flat = entry["counts"]
+            counts = dict(zip(flat[0::2], flat[1::2]))
+            model.docs[label] = int(entry["docs"])
+            model.totals[label] = int(entry["total"])
+            model.counts[label] = counts
+            model.vocabulary.update(counts)
+        return model
+
+class LocalClassifier:
+    """
+    Thread-safe wrapper that owns the model, decides when its predictions
+    are trustworthy, and persists it to LOCAL_MODEL_PATH.
+    """
+
+    def __init__(self, path: str = LOCAL_MODEL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.counters = {"learned_ai": 0, "learned_confirmed": 0, "predictions": 0, "confident": 0}
+        self.model = self._load()
+
+    def _load(self) -> NaiveBayesModel:
+        if not os.path.exists(self.path):
+            return NaiveBayesModel()
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                model = NaiveBayesModel.from_dict(json.load(f))
+            logger.info(f"🧠 Local model loaded: {model.trained_examples} examples, {len(model.docs)} classes")
+            return model
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"❌ Local model unreadable, starting empty: {e}")
+            return NaiveBayesModel()
+
+    def seed(self, examples: Iterable[Tuple[str, str]]):
+        """Give an empty model a starting vocabulary (e.g. the KB keywords); does not count as training"""
+        with self._lock:
+            if self.model.docs:
+                return
+            for text, label in examples:
+                if self.model.learn(text, label):
+                    self.model.seeded += 1
+            self._dirty = True
+
+    def learn(self, text: str, label: str, source: str = "confirmed") -> bool:
+        with self._lock:
+            learned = self.model.learn(text, label)
+            if learned:
+                self._dirty = True
+                self.counters[f"learned_{source}"] += 1
+        return learned
+
+    def learn_from_ai(self, text: str, result: Dict[str, Any]):
+        """Listener for AIHelper classifications"""
+        label = str(result.get("category", "")).strip()
+        try:
+            confidence = float(result.get("confidence", 0))
+        except (TypeError, ValueError):
+            return
+        if label and confidence >= LOCAL_MODEL_MIN_AI_CONFIDENCE:
+            self.learn(text, label, source="ai")
+
+    def predict(self, text: str) -> Optional[Tuple[str, float, Dict[str, float]]]:
+        """
+        ``(label, probability, probabilities)`` when the model is trained
+        enough and confident about ``text``, otherwise None.
+        """
+        with self._lock:
+            if self.model.trained_examples < LOCAL_MODEL_MIN_EXAMPLES:
+                return None
+            probabilities = self.model.predict(text)
+            self.counters["predictions"] += 1
+            if not probabilities:
+                return None
+            label = max(probabilities, key=probabilities.get)
+            if probabilities[label] < LOCAL_MODEL_MIN_CONFIDENCE:
+                return None
+            self.counters["confident"] += 1
+        return label, probabilities[label], probabilities
+
+    def save_if_dirty(self) -> bool:
+        """Write the model atomically; returns True if anything was written"""
+        with self._lock:
+            if not self._dirty:
+                return False
+            payload = json.dumps(self.model.to_dict(), separators=(",", ":"))
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            logger.error(f"❌ Local model save failed: {e}")
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "examples": self.model.trained_examples,
+                "seeded": self.model.seeded,
+                "classes": len(self.model.docs),
+                "features": len(self.model.vocabulary),
+                "min_examples": LOCAL_MODEL_MIN_EXAMPLES,
+                "min_confidence": LOCAL_MODEL_MIN_CONFIDENCE
+            }
+
+# Global instance
+local_classifier = LocalClassifier()
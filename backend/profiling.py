@@ -0,0 +1,154 @@
+"""
+On-demand request profiling for TechGuide Bot
+Runs one request under a stack-sampling or a deterministic (cProfile)
+profiler and turns the result into a call tree and flame-graph data.
+"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import random
+import cProfile
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"  # "sampling" or "deterministic"; needs X-Admin-Token
+PROFILE_MODES = ("sampling", "deterministic")
+# Fraction of /chat and /techguide requests profiled (sampling mode) and written to PROFILE_DIR
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+)
+# Oldest profiles are deleted beyond this many files
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "500"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "30"))
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+class StackSampler:
+    """Samples one thread's Python stack every PROFILE_INTERVAL_MS from a helper thread"""
+
+    def __init__(self, thread_id: int, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            # Walk up to profile_call so the threadpool plumbing above it is left out
+            while frame is not None and frame.f_code is not profile_call.__code__:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack and frame is not None:
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+
+    def __enter__(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def folded_stacks(stacks: Counter) -> List[str]:
+    """Brendan Gregg's folded format ("a;b;c 12"), the input of flamegraph.pl and speedscope"""
+    return [f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()]
+
+def call_tree(stacks: Counter) -> Dict[str, Any]:
+    root = {"name": "root", "samples": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = root
+        node["samples"] += count
+        for name in stack:
+            node = node["children"].setdefault(name, {"name": name, "samples": 0, "children": {}})
+            node["samples"] += count
+
+    def finish(node: Dict[str, Any]) -> Dict[str, Any]:
+        children = sorted(node["children"].values(), key=lambda child: -child["samples"])
+        return {"name": node["name"], "samples": node["samples"], "children": [finish(c) for c in children]}
+
+    return finish(root)
+
+def _cprofile_summary(profiler: cProfile.Profile) -> Dict[str, Any]:
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (calls, _, tottime, cumtime, callers) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{name}:{line}",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+            "callers": sorted(f"{os.path.basename(f)}:{n}:{l}" for f, l, n in callers)
+        })
+    rows.sort(key=lambda row: -row["cumtime_ms"])
+    # Caller -> callee edges weighted by time, enough to draw a call graph
+    edges = [
+        f"{caller};{row['function']} {row['cumtime_ms']}"
+        for row in rows[:PROFILE_TOP_FUNCTIONS] for caller in row["callers"]
+    ]
+    return {"functions": rows[:PROFILE_TOP_FUNCTIONS], "call_edges": edges}
+
+def profile_call(mode: str, fn: Callable, *args) -> Tuple[Any, Dict[str, Any]]:
+    """Run ``fn(*args)`` in this thread under the chosen profiler; returns (result, profile)"""
+    started = time.perf_counter()
+    if mode == "deterministic":
+        profiler = cProfile.Profile()
+        result = profiler.runcall(fn, *args)
+        profile = _cprofile_summary(profiler)
+    else:
+        with StackSampler(threading.get_ident()) as sampler:
+            result = fn(*args)
+        profile = {
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "samples": sum(sampler.stacks.values()),
+            "call_tree": call_tree(sampler.stacks),
+            "folded": folded_stacks(sampler.stacks)
+        }
+    profile["mode"] = mode
+    profile["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result, profile
+
+def should_sample() -> bool:
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def store_profile(endpoint: str, profile: Dict[str, Any], trace_id: Optional[str] = None) -> Optional[str]:
+    """Write the profile as JSON (plus .folded for flame-graph tools); returns the file path"""
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        base = os.path.join(PROFILE_DIR, f"{stamp}-{endpoint}-{profile['mode']}")
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump({"endpoint": endpoint, "trace_id": trace_id, "timestamp": stamp, **profile}, f)
+        if "folded" in profile:
+            with open(f"{base}.folded", "w", encoding="utf-8") as f:
+                f.write("\n".join(profile["folded"]) + "\n")
+        _prune()
+        return f"{base}.json"
+    except OSError as e:
+        logger.warning(f"⚠️ Could not store profile: {e}")
+        return None
+
+def _prune():
+    files = sorted(os.listdir(PROFILE_DIR))
+    profiles = [name for name in files if name.endswith(".json")]
+    for name in profiles[:max(0, len(profiles) - PROFILE_MAX_FILES)]:
+        for suffix in (".json", ".folded"):
+            path = os.path.join(PROFILE_DIR, name[:-len(".json")] + suffix)
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,110 @@
+"""
+Quick-start intents for TechGuide Bot
+The frontend's canned prompts always map to the same category, so their
+answers are built once per knowledge-base version and served from memory.
+"""
+
+import os
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from knowledge_base import KnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+# Seconds between AI rewrites of the intro text shown above each card (0: never)
+QUICK_START_AI_REFRESH = float(os.getenv("QUICK_START_AI_REFRESH", "0"))
+
+@dataclass(frozen=True, slots=True)
+class QuickStartIntent:
+    id: str
+    label: str
+    message: str
+    category_id: str
+
+QUICK_START_INTENTS: Tuple[QuickStartIntent, ...] = (
+    QuickStartIntent("web", "Web Dev", "I want to build websites", "1"),
+    QuickStartIntent("data", "Data Science", "I want to work with data", "2"),
+    QuickStartIntent("mobile", "Mobile Apps", "I want to create mobile apps", "3"),
+    QuickStartIntent("games", "Game Dev", "I want to make games", "4"),
+)
+
+class QuickStartResponses:
+    """
+    Recommendation payloads for every intent, rebuilt lazily when the
+    knowledge-base version changes. Optional AI-written intros are kept per
+    version, so a reload never serves an intro for an old category text.
+    """
+
+    def __init__(self, intents: Tuple[QuickStartIntent, ...] = QUICK_START_INTENTS):
+        self.intents = {intent.id: intent for intent in intents}
+        self._by_message = {intent.message.lower(): intent.id for intent in intents}
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._responses: Dict[str, Dict[str, Any]] = {}
+        # intent id -> (kb version, intro text)
+        self._intros: Dict[str, Tuple[str, str]] = {}
+        self.served = 0
+
+    def match(self, message: str) -> Optional[str]:
+        """Intent id of a message that is exactly one of the canned prompts"""
+        return self._by_message.get(message.lower().strip())
+
+    def _build(self, kb: KnowledgeBase):
+        responses = {}
+        for intent in self.intents.values():
+            result = kb.recommendation(intent.category_id, "")
+            if result is None:
+                continue
+            result["quick_start"] = intent.id
+            result["metadata"]["classification"] = {"tier": "quick_start", "source": "intent", "confidence": 1.0}
+            version, intro = self._intros.get(intent.id, (None, None))
+            if version == kb.version:
+                result["response"] = intro
+            responses[intent.id] = result
+        self._responses, self._version = responses, kb.version
+
+    def response(self, intent_id: str, session_id: str, kb: KnowledgeBase) -> Optional[Dict[str, Any]]:
+        """A copy of the precomputed payload for ``intent_id``; None if unknown"""
+        if self._version != kb.version:
+            with self._lock:
+                if self._version != kb.version:
+                    self._build(kb)
+        cached = self._responses.get(intent_id)
+        if cached is None:
+            return None
+        self.served += 1
+        # Callers add session fields, so only the two top-level dicts are copied
+        return {**cached, "metadata": {**cached["metadata"], "session_id": session_id}}
+
+    def refresh_with_ai(self, kb: KnowledgeBase, chat: Callable[[str, Optional[str]], Dict[str, Any]]) -> int:
+        """Ask the AI for a short intro per intent (blocking); returns how many were updated"""
+        updated = 0
+        for intent in self.intents.values():
+            category = kb.get(intent.category_id)
+            if category is None:
+                continue
+            result = chat(
+                f"{intent.message}. In two or three friendly sentences, introduce why "
+                f"{category.lang} is a great choice. Do not list resources.",
+                "Quick-start button"
+            )
+            if result.get("success") and result.get("response"):
+                with self._lock:
+                    self._intros[intent.id] = (kb.version, result["response"].strip())
+                updated += 1
+        with self._lock:
+            self._version = None
+        logger.info(f"⚡ Refreshed {updated}/{len(self.intents)} quick-start intros")
+        return updated
+
+    def list_intents(self) -> List[Dict[str, str]]:
+        return [
+            {"id": intent.id, "label": intent.label, "message": intent.message}
+            for intent in self.intents.values()
+        ]
+
+# Global instance
+quick_start = QuickStartResponses()
@@ -0,0 +1,124 @@
+"""
+Admission control for AI-backed requests
+Token buckets per session, per client IP and one global AI budget.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# Budgets are expressed per minute; bursts are bucket capacities
+AI_RATE_PER_SESSION = float(os.getenv("AI_RATE_PER_SESSION_PER_MIN", "10"))
+AI_BURST_PER_SESSION = float(os.getenv("AI_BURST_PER_SESSION", "5"))
+AI_RATE_PER_IP = float(os.getenv("AI_RATE_PER_IP_PER_MIN", "30"))
+AI_BURST_PER_IP = float(os.getenv("AI_BURST_PER_IP", "10"))
+AI_GLOBAL_PER_MIN = float(os.getenv("AI_GLOBAL_PER_MIN", "120"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+class KeyedRateLimiter:
+    """
+    Token buckets keyed by an id, bounded to ``max_keys`` entries.
+
+    Buckets live in an OrderedDict used as an LRU, so lookup, refill and
+    eviction are all O(1). An evicted key simply comes back with a full
+    bucket, which is why per-session limits are paired with per-IP ones.
+    """
+
+    def __init__(self, rate_per_min: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def _bucket(self, key: str, now: float) -> TokenBucket:
+        """The key's bucket, refilled up to ``now``"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        return bucket
+
+    def available(self, key: str, now: float) -> bool:
+        return self._bucket(key, now).tokens >= 1.0
+
+    def take(self, key: str, now: float):
+        self._bucket(key, now).tokens -= 1.0
+
+    def try_acquire(self, key: str, now: float) -> bool:
+        if self.available(key, now):
+            self.take(key, now)
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+class AdmissionController:
+    """Decides whether a request may use the AI path or must degrade to keywords"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.per_session = KeyedRateLimiter(AI_RATE_PER_SESSION, AI_BURST_PER_SESSION)
+        self.per_ip = KeyedRateLimiter(AI_RATE_PER_IP, AI_BURST_PER_IP)
+        self.global_budget = KeyedRateLimiter(AI_GLOBAL_PER_MIN, AI_GLOBAL_PER_MIN, max_keys=1)
+        self.counters = {
+            "admitted": 0,
+            "throttled_ip": 0,
+            "throttled_session": 0,
+            "throttled_global": 0,
+            "degraded": 0
+        }
+
+    def admit_ai(self, session_id: str, client_ip: Optional[str] = None) -> bool:
+        """
+        Take one AI token from every bucket, or from none: all buckets are
+        checked first, so a request rejected by one does not drain the others.
+        False means the caller should use the keyword path.
+        """
+        now = time.monotonic()
+        checks = [(self.per_ip, client_ip, "throttled_ip")] if client_ip else []
+        checks += [
+            (self.per_session, session_id, "throttled_session"),
+            (self.global_budget, "global", "throttled_global")
+        ]
+        with self._lock:
+            for limiter, key, reason in checks:
+                if not limiter.available(key, now):
+                    self.counters[reason] += 1
+                    self.counters["degraded"] += 1
+                    return False
+            for limiter, key, _ in checks:
+                limiter.take(key, now)
+            self.counters["admitted"] += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "tracked_sessions": len(self.per_session),
+                "tracked_ips": len(self.per_ip),
+                "limits": {
+                    "per_session_per_min": AI_RATE_PER_SESSION,
+                    "per_ip_per_min": AI_RATE_PER_IP,
+                    "global_per_min": AI_GLOBAL_PER_MIN
+                }
+            }
+
+# Global instance
+admission = AdmissionController()
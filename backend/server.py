@@ -3,25 +3,45 @@
 Enhanced FastAPI Server with Chat Endpoints
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Iterator
 import logging
 from datetime import datetime
 import uuid
 import os
 import json
+import time
+import asyncio
 from collections import defaultdict
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+
+from log_config import configure_logging, request_id_var, safe_message, DroppingQueueHandler
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+from knowledge_base import knowledge_base, KnowledgeBase
+from rate_limit import admission
+from local_model import local_classifier
+from cascade import cascade
+from analytics import analytics
+from session_store import Session
+from quick_start import quick_start, QUICK_START_AI_REFRESH
+from brownout import brownout, BROWNOUT_INTERVAL, LEVELS as BROWNOUT_LEVELS
+from idempotency import (
+    idempotency, fingerprint, IdempotencyConflict,
+    IDEMPOTENCY_HEADER, IDEMPOTENCY_MAX_KEY_LENGTH, REPLAYED_HEADER
+)
+from health import prober
+from tracing import span, record_span, exporter, current_trace_id, TRACE_HEADER
+from profiling import profile_call, store_profile, should_sample, PROFILE_HEADER, PROFILE_MODES
+
 # Try to import AI helper
 try:
     from ai_helper import ai_helper
@@ -31,6 +51,24 @@ except Exception as e:
     AI_AVAILABLE = False
     logger.warning(f"⚠️ AI Helper not available: {e}")
 
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Seconds between knowledge-base file checks (0 disables the watcher)
+KB_WATCH_INTERVAL = float(os.getenv("KB_WATCH_INTERVAL", "10"))
+# Reverse proxies in front of the server that append to X-Forwarded-For; the
+# client IP is the hop the outermost of them added (0: use the socket peer)
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+# WebSocket chat: app-level ping cadence, pong grace, queued turns, message size
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", "20"))
+WS_PONG_TIMEOUT = float(os.getenv("WS_PONG_TIMEOUT", "10"))
+WS_MAX_PENDING = int(os.getenv("WS_MAX_PENDING", "4"))
+WS_MAX_MESSAGE_CHARS = int(os.getenv("WS_MAX_MESSAGE_CHARS", "4000"))
+# Messages starting with these words are answered by AI chat, not classified
+QUESTION_WORDS = {"what", "why", "how", "which", "should", "can", "could", "is", "are",
+                  "do", "does", "when", "where", "who", "compare", "explain", "tell"}
+# Seconds between saves of the local classifier when it has learned something
+LOCAL_MODEL_SAVE_INTERVAL = float(os.getenv("LOCAL_MODEL_SAVE_INTERVAL", "60"))
+
 # Initialize FastAPI app
 app = FastAPI(
     title="TechGuide Bot API - Advanced",
@@ -48,282 +86,56 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """
+    Tag every log line of a request with its id (X-Request-ID or a new one)
+    and open the root span of its trace (X-Trace-ID or a new one)
+    """
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    try:
+        with span(f"{request.method} {request.url.path}", trace_id=request.headers.get(TRACE_HEADER),
+                  request_id=request_id) as root:
+            request.state.received = time.perf_counter()
+            response = await call_next(request)
+            root.set(status_code=response.status_code)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    response.headers["X-Trace-ID"] = root.trace_id
+    return response
 
-# In-memory session storage
-sessions = defaultdict(lambda: {
-    "created_at": datetime.now().isoformat(),
-    "messages": [],
-    "recommendations": []
-})
+# In-memory session storage (compact records, see session_store.py)
+sessions: Dict[str, Session] = defaultdict(Session)
 
 # Request/Response Models
 class ChatRequest(BaseModel):
     message: str = Field(..., description="User message")
     session_id: Optional[str] = Field(None, description="Session ID")
 
+class QuickStartRequest(BaseModel):
+    session_id: Optional[str] = Field(None, description="Session ID")
+
 class TechGuideRequest(BaseModel):
-    choice: Optional[str] = Field(None, description="Choice number (1-4)")
+    choice: Optional[str] = Field(None, description="Category number (the ids listed by /kb/snapshot)")
     message: Optional[str] = Field(None, description="Free text describing interest")
     session_id: Optional[str] = Field(None, description="Session ID")
 
 class EnhancedBackend:
-    """Enhanced backend with 10+ technology categories"""
-    
-    INTEREST_MAP = {
-        "1": {
-            "lang": "JavaScript",
-            "reason": "JavaScript powers the modern web. Master it to build interactive frontends with React/Vue/Angular and scalable backends with Node.js. It's versatile, beginner-friendly, and has the largest developer community.",
-            "difficulty": "Beginner",
-            "time": "3-4 months",
-            "learning_path": [
-                {"phase": "Fundamentals", "duration": "4 weeks", "topics": ["Variables, Functions, DOM", "ES6+ features", "Async/Promises", "Fetch API"]},
-                {"phase": "Frontend Frameworks", "duration": "6 weeks", "topics": ["React ecosystem", "State management (Redux/Context)", "Component architecture", "Routing & Forms"]},
-                {"phase": "Backend & Full-Stack", "duration": "6 weeks", "topics": ["Node.js & Express", "REST APIs", "Database integration", "Authentication"]},
-                {"phase": "Real Projects", "duration": "4 weeks", "topics": ["E-commerce site", "Social media clone", "Real-time chat app", "Deploy to Vercel/Heroku"]}
-            ],
-            "career_paths": ["Frontend Developer", "Full-Stack Developer", "React Developer", "Node.js Backend Engineer", "JavaScript Architect"]
-        },
-        "2": {
-            "lang": "Python",
-            "reason": "Python dominates data science, AI/ML, automation, and backend development. Its simple syntax makes it perfect for beginners, while its powerful libraries (NumPy, Pandas, TensorFlow, Django) make it a professional powerhouse.",
-            "difficulty": "Beginner",
-            "time": "4-6 months",
-            "learning_path": [
-                {"phase": "Core Python", "duration": "3 weeks", "topics": ["Syntax, Data structures", "OOP, Functions", "File I/O, Error handling", "Modules & packages"]},
-                {"phase": "Data Science Stack", "duration": "8 weeks", "topics": ["NumPy & Pandas", "Matplotlib & Seaborn", "SQL & databases", "Statistical analysis"]},
-                {"phase": "Machine Learning", "duration": "8 weeks", "topics": ["Scikit-learn fundamentals", "Supervised/Unsupervised learning", "Model evaluation", "TensorFlow/PyTorch intro"]},
-                {"phase": "Applied Projects", "duration": "5 weeks", "topics": ["Kaggle competitions", "Predictive analytics", "NLP project", "Computer vision basics"]}
-            ],
-            "career_paths": ["Data Scientist", "ML Engineer", "AI Researcher", "Python Backend Developer", "Data Analyst", "Automation Engineer"]
-        },
-        "3": {
-            "lang": "Swift/Kotlin",
-            "reason": "Swift (iOS) and Kotlin (Android) are the official languages for native mobile development. Build blazing-fast, beautiful apps that leverage platform-specific features. High demand, great salaries, and direct access to billions of users.",
-            "difficulty": "Intermediate",
-            "time": "6-9 months",
-            "learning_path": [
-                {"phase": "Language Mastery", "duration": "6 weeks", "topics": ["Swift/Kotlin syntax", "OOP & protocols", "Memory management", "Concurrency basics"]},
-                {"phase": "Platform Development", "duration": "8 weeks", "topics": ["UIKit/SwiftUI or Jetpack Compose", "Navigation & lifecycle", "Networking & APIs", "Local data persistence"]},
-                {"phase": "Advanced Features", "duration": "6 weeks", "topics": ["Push notifications", "Core Data/Room", "Camera & media", "App architecture (MVVM/MVI)"]},
-                {"phase": "Ship Apps", "duration": "8 weeks", "topics": ["3-5 portfolio apps", "App Store optimization", "TestFlight/Play Console", "User feedback iteration"]}
-            ],
-            "career_paths": ["iOS Developer", "Android Developer", "Mobile Architect", "Cross-Platform Developer", "Mobile Team Lead"]
-        },
-        "4": {
-            "lang": "C#/C++",
-            "reason": "Game dev powerhouses! C# with Unity dominates indie and mobile games with its accessibility. C++ with Unreal Engine powers AAA titles with cutting-edge graphics. Both offer creative careers in a $200B+ industry.",
-            "difficulty": "Intermediate",
-            "time": "6-12 months",
-            "learning_path": [
-                {"phase": "Language & Math", "duration": "8 weeks", "topics": ["C#/C++ fundamentals", "OOP concepts", "Vectors & matrices", "Physics basics"]},
-                {"phase": "Engine Fundamentals", "duration": "10 weeks", "topics": ["Unity/Unreal interface", "GameObject systems", "Physics engines", "Lighting & materials"]},
-                {"phase": "Game Mechanics", "duration": "10 weeks", "topics": ["Player controllers", "AI & pathfinding", "Animation systems", "UI/UX for games"]},
-                {"phase": "Complete Games", "duration": "12 weeks", "topics": ["2D platformer", "3D action game", "Multiplayer basics", "Polish & publish"]}
-            ],
-            "career_paths": ["Game Developer", "Unity Engineer", "Unreal Developer", "Gameplay Programmer", "Technical Artist", "Engine Programmer"]
-        },
-        "5": {
-            "lang": "Go (Golang)",
-            "reason": "Go is Google's language for building fast, concurrent, cloud-native systems. Perfect for microservices, APIs, DevOps tools, and distributed systems. Simple syntax, powerful concurrency, and blazing performance make it ideal for backend infrastructure.",
-            "difficulty": "Intermediate",
-            "time": "4-6 months",
-            "learning_path": [
-                {"phase": "Go Fundamentals", "duration": "4 weeks", "topics": ["Syntax & types", "Goroutines & channels", "Error handling", "Testing"]},
-                {"phase": "Backend Development", "duration": "6 weeks", "topics": ["HTTP servers", "REST APIs", "Database integration", "Middleware patterns"]},
-                {"phase": "Cloud & DevOps", "duration": "6 weeks", "topics": ["Docker containers", "Kubernetes basics", "CI/CD pipelines", "Microservices"]},
-                {"phase": "Production Systems", "duration": "4 weeks", "topics": ["gRPC services", "Distributed systems", "Monitoring & logging", "Deploy to cloud"]}
-            ],
-            "career_paths": ["Backend Engineer", "DevOps Engineer", "Site Reliability Engineer", "Cloud Architect", "Infrastructure Engineer"]
-        },
-        "6": {
-            "lang": "Rust",
-            "reason": "Rust delivers C++-level performance with memory safety guarantees. No garbage collector, no data races. Ideal for systems programming, embedded systems, WebAssembly, blockchain, and performance-critical applications. Steep learning curve but massive long-term payoff.",
-            "difficulty": "Advanced",
-            "time": "8-12 months",
-            "learning_path": [
-                {"phase": "Ownership & Borrowing", "duration": "6 weeks", "topics": ["Memory safety", "Lifetimes", "Move semantics", "Borrow checker"]},
-                {"phase": "Systems Programming", "duration": "8 weeks", "topics": ["Concurrency", "Unsafe Rust", "FFI", "Performance optimization"]},
-                {"phase": "Real Applications", "duration": "10 weeks", "topics": ["CLI tools", "Web servers", "WebAssembly", "Embedded systems"]},
-                {"phase": "Advanced Topics", "duration": "8 weeks", "topics": ["Async/await", "Macros", "Blockchain dev", "Open source contribution"]}
-            ],
-            "career_paths": ["Systems Programmer", "Blockchain Developer", "Performance Engineer", "Embedded Systems Engineer", "WebAssembly Developer"]
-        },
-        "7": {
-            "lang": "TypeScript",
-            "reason": "TypeScript is JavaScript with superpowers - static typing prevents bugs and improves developer experience. Essential for large-scale applications, it's used by Microsoft, Google, and Airbnb. If you know JavaScript, TypeScript is a natural next step.",
-            "difficulty": "Intermediate",
-            "time": "2-3 months (assuming JS knowledge)",
-            "learning_path": [
-                {"phase": "TypeScript Basics", "duration": "3 weeks", "topics": ["Type system", "Interfaces", "Generics", "Utility types"]},
-                {"phase": "Frontend with TS", "duration": "4 weeks", "topics": ["React + TypeScript", "Type-safe APIs", "Component typing", "Advanced patterns"]},
-                {"phase": "Backend with TS", "duration": "4 weeks", "topics": ["Node.js + TypeScript", "Express typing", "ORM integration", "Testing"]},
-                {"phase": "Production Ready", "duration": "3 weeks", "topics": ["Build tooling", "Strict mode", "Monorepos", "Deploy full-stack app"]}
-            ],
-            "career_paths": ["TypeScript Developer", "Full-Stack Engineer", "Frontend Architect", "Node.js Engineer"]
-        },
-        "8": {
-            "lang": "SQL & Database Management",
-            "reason": "Every application needs data storage. Master SQL for relational databases (PostgreSQL, MySQL) and understand NoSQL (MongoDB, Redis). Data is the foundation of modern software - database skills are universally valuable across all tech roles.",
-            "difficulty": "Beginner-Intermediate",
-            "time": "3-5 months",
-            "learning_path": [
-                {"phase": "SQL Fundamentals", "duration": "4 weeks", "topics": ["SELECT queries", "JOINs", "Aggregations", "Subqueries"]},
-                {"phase": "Database Design", "duration": "4 weeks", "topics": ["Normalization", "Indexes", "Constraints", "Transactions"]},
-                {"phase": "Advanced SQL", "duration": "4 weeks", "topics": ["Window functions", "CTEs", "Performance tuning", "Stored procedures"]},
-                {"phase": "NoSQL & Modern", "duration": "4 weeks", "topics": ["MongoDB", "Redis caching", "Graph databases", "Data modeling"]}
-            ],
-            "career_paths": ["Database Administrator", "Data Engineer", "Backend Developer", "Data Analyst", "Database Architect"]
-        },
-        "9": {
-            "lang": "Java",
-            "reason": "Java runs everywhere - from Android apps to enterprise backends. Used by banks, e-commerce giants, and Android. Strong typing, mature ecosystem, and massive job market make it a safe, lucrative choice. Spring Boot makes modern Java development enjoyable.",
-            "difficulty": "Intermediate",
-            "time": "5-7 months",
-            "learning_path": [
-                {"phase": "Core Java", "duration": "6 weeks", "topics": ["OOP principles", "Collections", "Exceptions", "Generics", "Lambda expressions"]},
-                {"phase": "Spring Framework", "duration": "8 weeks", "topics": ["Spring Boot", "REST APIs", "JPA & Hibernate", "Security"]},
-                {"phase": "Enterprise Patterns", "duration": "6 weeks", "topics": ["Microservices", "Messaging (Kafka)", "Caching", "Testing"]},
-                {"phase": "Production Apps", "duration": "6 weeks", "topics": ["CI/CD", "Docker", "Cloud deployment", "Monitoring"]}
-            ],
-            "career_paths": ["Java Backend Developer", "Android Developer", "Enterprise Architect", "DevOps Engineer", "Java Team Lead"]
-        },
-        "10": {
-            "lang": "Ruby (Ruby on Rails)",
-            "reason": "Ruby on Rails revolutionized web development with 'convention over configuration'. Build full-stack apps incredibly fast. Perfect for startups, MVPs, and rapid prototyping. Companies like GitHub, Shopify, and Airbnb were built on Rails.",
-            "difficulty": "Beginner",
-            "time": "4-6 months",
-            "learning_path": [
-                {"phase": "Ruby Language", "duration": "3 weeks", "topics": ["Ruby syntax", "Blocks & iterators", "OOP in Ruby", "Gems"]},
-                {"phase": "Rails Framework", "duration": "8 weeks", "topics": ["MVC pattern", "ActiveRecord", "Routing", "Views & Helpers"]},
-                {"phase": "Advanced Rails", "duration": "6 weeks", "topics": ["Authentication", "APIs", "ActionCable (WebSockets)", "Background jobs"]},
-                {"phase": "Deploy & Scale", "duration": "4 weeks", "topics": ["Heroku deployment", "Testing (RSpec)", "Performance", "Real startup app"]}
-            ],
-            "career_paths": ["Rails Developer", "Full-Stack Engineer", "Startup CTO", "Backend Developer"]
-        },
-        "11": {
-            "lang": "PHP (Laravel)",
-            "reason": "PHP powers 77% of websites (WordPress, Facebook started here). Modern PHP with Laravel is elegant, fast, and productive. Massive freelance market, easy deployment, and mature ecosystem. Great for web agencies and freelancers.",
-            "difficulty": "Beginner",
-            "time": "4-5 months",
-            "learning_path": [
-                {"phase": "PHP Basics", "duration": "3 weeks", "topics": ["Syntax", "OOP", "Error handling", "Composer"]},
-                {"phase": "Laravel Framework", "duration": "6 weeks", "topics": ["Routing", "Eloquent ORM", "Blade templates", "Middleware"]},
-                {"phase": "Advanced Laravel", "duration": "5 weeks", "topics": ["APIs", "Authentication", "Queues", "Testing"]},
-                {"phase": "Professional Dev", "duration": "4 weeks", "topics": ["Payment integration", "Real-time features", "Deploy", "Client projects"]}
-            ],
-            "career_paths": ["PHP Developer", "Laravel Specialist", "WordPress Developer", "Freelance Developer", "Web Agency Developer"]
-        },
-        "12": {
-            "lang": "Cybersecurity & Ethical Hacking",
-            "reason": "Learn to think like an attacker to defend systems. Master penetration testing, network security, and vulnerability assessment. High demand, excellent pay, and you're always learning. Python, Bash, and networking knowledge required.",
-            "difficulty": "Advanced",
-            "time": "8-12 months",
-            "learning_path": [
-                {"phase": "Foundations", "duration": "6 weeks", "topics": ["Networking basics", "Linux/Bash", "Python scripting", "Security concepts"]},
-                {"phase": "Offensive Security", "duration": "10 weeks", "topics": ["Penetration testing", "Web vulnerabilities", "Network attacks", "Exploitation"]},
-                {"phase": "Defense & Response", "duration": "8 weeks", "topics": ["Security monitoring", "Incident response", "Forensics", "SIEM tools"]},
-                {"phase": "Certifications", "duration": "8 weeks", "topics": ["CEH prep", "CompTIA Security+", "Real penetration tests", "Bug bounties"]}
-            ],
-            "career_paths": ["Penetration Tester", "Security Analyst", "Ethical Hacker", "Security Engineer", "Bug Bounty Hunter"]
-        }
-    }
-    
-    RESOURCES_MAP = {
-        "JavaScript": [
-            "MDN Web Docs - https://developer.mozilla.org",
-            "freeCodeCamp - https://freecodecamp.org",
-            "JavaScript.info - https://javascript.info",
-            "React Official Docs - https://react.dev",
-            "Node.js Docs - https://nodejs.org/docs"
-        ],
-        "Python": [
-            "Python.org Tutorial - https://docs.python.org/3/tutorial/",
-            "Real Python - https://realpython.com",
-            "DataCamp - https://datacamp.com",
-            "Kaggle Learn - https://kaggle.com/learn",
-            "Fast.ai - https://fast.ai"
-        ],
-        "Swift/Kotlin": [
-            "Apple Developer - https://developer.apple.com",
-            "Android Developer - https://developer.android.com",
-            "Ray Wenderlich - https://raywenderlich.com",
-            "Hacking with Swift - https://hackingwithswift.com"
-        ],
-        "C#/C++": [
-            "Unity Learn - https://learn.unity.com",
-            "Unreal Docs - https://docs.unrealengine.com",
-            "GameDev.tv - https://gamedev.tv",
-            "Microsoft Learn - https://learn.microsoft.com"
-        ],
-        "Go (Golang)": [
-            "Go Official Tour - https://go.dev/tour",
-            "Go by Example - https://gobyexample.com",
-            "Uber Go Style Guide - https://github.com/uber-go/guide",
-            "Golang.org Docs - https://golang.org/doc"
-        ],
-        "Rust": [
-            "The Rust Book - https://doc.rust-lang.org/book/",
-            "Rust by Example - https://doc.rust-lang.org/rust-by-example/",
-            "Rustlings - https://github.com/rust-lang/rustlings",
-            "Let's Get Rusty - https://letsgetrusty.com"
-        ],
-        "TypeScript": [
-            "TypeScript Handbook - https://typescriptlang.org/docs/handbook/",
-            "TypeScript Deep Dive - https://basarat.gitbook.io/typescript/",
-            "Total TypeScript - https://totaltypescript.com",
-            "Execute Program - https://executeprogram.com"
-        ],
-        "SQL & Database Management": [
-            "Mode SQL Tutorial - https://mode.com/sql-tutorial/",
-            "PostgreSQL Tutorial - https://postgresqltutorial.com",
-            "MongoDB University - https://university.mongodb.com",
-            "SQLBolt - https://sqlbolt.com"
-        ],
-        "Java": [
-            "Oracle Java Tutorials - https://docs.oracle.com/javase/tutorial/",
-            "Spring Boot Docs - https://spring.io/guides",
-            "Baeldung - https://baeldung.com",
-            "Java Brains - https://javabrains.io"
-        ],
-        "Ruby (Ruby on Rails)": [
-            "Ruby Docs - https://ruby-doc.org",
-            "Rails Guides - https://guides.rubyonrails.org",
-            "The Odin Project - https://theodinproject.com",
-            "GoRails - https://gorails.com"
-        ],
-        "PHP (Laravel)": [
-            "Laravel Docs - https://laravel.com/docs",
-            "PHP The Right Way - https://phptherightway.com",
-            "Laracasts - https://laracasts.com",
-            "PHP.net Manual - https://php.net/manual"
-        ],
-        "Cybersecurity & Ethical Hacking": [
-            "TryHackMe - https://tryhackme.com",
-            "HackTheBox - https://hackthebox.com",
-            "Cybrary - https://cybrary.it",
-            "OWASP - https://owasp.org",
-            "PortSwigger Web Academy - https://portswigger.net/web-security"
-        ]
-    }
-    
-    KEYWORDS = {
-        "1": ["web", "website", "frontend", "backend", "browser", "html", "css", "javascript", "react", "node", "interface", "user interface", "full stack", "fullstack"],
-        "2": ["data", "science", "analysis", "analytics", "machine learning", "ml", "ai", "artificial intelligence", "pandas", "model", "predict", "climate", "weather", "statistic", "visual", "dataset", "pattern", "numpy", "tensorflow"],
-        "3": ["mobile", "app", "ios", "android", "phone", "smartphone", "iphone", "download", "swift", "kotlin"],
-        "4": ["game", "gaming", "games", "3d", "graphics", "unity", "unreal", "character", "world", "interactive experience", "video game", "gameplay"],
-        "5": ["go", "golang", "concurrent", "microservice", "cloud", "devops", "infrastructure", "scalable", "distributed", "kubernetes", "docker"],
-        "6": ["rust", "performance", "system", "memory", "embedded", "webassembly", "wasm", "blockchain", "low level", "safe"],
-        "7": ["typescript", "type safe", "typed", "javascript with types", "ts", "static typing", "type system"],
-        "8": ["database", "sql", "mysql", "postgresql", "mongodb", "data storage", "query", "nosql", "redis", "data modeling"],
-        "9": ["java", "enterprise", "spring", "android java", "jvm", "backend java", "corporate"],
-        "10": ["ruby", "rails", "ruby on rails", "startup", "mvp", "rapid development", "convention"],
-        "11": ["php", "laravel", "wordpress", "web development php", "freelance", "cms"],
-        "12": ["security", "hacking", "penetration", "cybersecurity", "ethical hacking", "vulnerability", "infosec", "pentesting", "network security"]
-    }
+    """Enhanced backend with 10+ technology categories (see knowledge_base.py)"""
     
     @classmethod
-    def process_chat(cls, message: str, session_id: str) -> Dict[str, Any]:
-        """Process chat with AI if available, fallback to rules"""
+    def process_chat(cls, message: str, session_id: str, client_ip: Optional[str] = None,
+                     on_chunk: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Classify locally first and only escalate to the AI (classification,
+        then chat) when the cheap tiers are unsure and the budget allows.
+        With on_chunk, the AI answer is streamed and each text chunk is passed to it.
+        """
+        kb = knowledge_base.current()
         msg_lower = message.lower().strip()
         
         # Very short greetings
@@ -334,169 +146,617 @@ class EnhancedBackend:
                 "type": "greeting"
             }
         
-        # Try AI first if available
-        if AI_AVAILABLE:
+        # Canned quick-start prompts are answered from memory
+        intent_id = quick_start.match(message)
+        if intent_id:
+            result = quick_start.response(intent_id, session_id, kb)
+            if result:
+                sessions[session_id].context.reset()
+                return result
+        
+        # Cheap tiers first: confident keyword / local-model answers skip the AI
+        with span("classification", stage="local_tiers") as classification:
+            decision = cascade.classify_locally(message, kb, sessions[session_id].context)
+            classification.set(answered_by=decision["tier"] if decision["category"] else None)
+        if decision["category"]:
+            return cls.recommend_from_decision(decision, session_id, kb)
+        
+        # Escalate to the AI if available; over-budget clients and brownouts degrade to keywords
+        shed = AI_AVAILABLE and not brownout.allow_ai()
+        ai_admitted = AI_AVAILABLE and not shed and admission.admit_ai(session_id, client_ip)
+        if ai_admitted:
             try:
-                from ai_helper import chat_with_ai
-                
-                # Get conversation context
-                context = f"Session: {session_id}"
-                
-                ai_response = chat_with_ai(message, context)
-                
-                if ai_response.get("success"):
-                    return {
-                        "status": "ok",
-                        "response": ai_response["response"],
-                        "type": "ai_chat",
-                        "ai_powered": True,
-                        "model": "gemini-pro"
-                    }
+                with brownout.track_ai():
+                    result = cls.answer_with_ai(message, msg_lower, session_id, kb, on_chunk)
+                if result:
+                    return result
             except Exception as e:
                 logger.warning(f"AI failed, using fallback: {e}")
         
-        # Fallback to keyword-based classification
-        return cls.classify_and_recommend(message, session_id)
-        
+        # Nothing was confident enough: ask the user
+        result = cls.clarification(decision)
+        if shed:
+            result["degraded"] = "brownout"
+        elif AI_AVAILABLE and not ai_admitted:
+            result["degraded"] = "rate_limited"
+        return result
+    
     @classmethod
-    def classify_and_recommend(cls, text: str, session_id: str) -> Dict[str, Any]:
-        """Smarter classification with better keyword matching"""
-        text_lower = text.lower()
-        scores = {"1": 0, "2": 0, "3": 0, "4": 0}
+    def answer_with_ai(cls, message: str, msg_lower: str, session_id: str, kb: KnowledgeBase,
+                       on_chunk: Optional[Callable[[str], None]] = None) -> Optional[Dict[str, Any]]:
+        """AI classification, then AI chat; None when neither produced an answer"""
+        from ai_helper import chat_with_ai, stream_chat_with_ai
         
-        # Score each category with weighted keywords
-        for choice, keywords in cls.KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    # Exact word boundary matches get more weight
-                    if f" {keyword} " in f" {text_lower} " or text_lower.startswith(keyword) or text_lower.endswith(keyword):
-                        scores[choice] += 3
-                    else:
-                        scores[choice] += 1
+        # Questions want an answer, not a category, so they go straight to chat
+        if not cls.is_question(msg_lower):
+            with span("classification", stage="ai_classify"):
+                ai_decision = cascade.classify_with_ai(
+                    message, kb, ai_helper.classify_interest, sessions[session_id].context
+                )
+            if ai_decision["category"]:
+                result = cls.recommend_from_decision(ai_decision, session_id, kb)
+                result["ai_powered"] = True
+                return result
         
-        max_score = max(scores.values())
-        best_choice = max(scores, key=scores.get) if max_score > 0 else ""
+        # Get conversation context
+        context = f"Session: {session_id}"
         
-        # Need at least score of 2 to be confident
-        if not best_choice or max_score < 2:
-            return {
-                "status": "clarification_needed",
-                "response": "I'd love to help! Could you be more specific?\n\n1. 🌐 **Web Development** - Websites and web apps\n2. 📊 **Data Science** - Data analysis, ML, AI\n3. 📱 **Mobile Apps** - iOS/Android apps\n4. 🎮 **Game Development** - Video games\n\nWhich area interests you most?",
-                "type": "clarification"
-            }
+        # Brownout levels turn streaming off first, then cap the answer length
+        streamed = bool(on_chunk) and brownout.allow_streaming()
+        started = time.perf_counter()
+        with span("ai_call", streamed=streamed) as ai_call:
+            if streamed:
+                parts = []
+                info: Dict[str, Any] = {}
+                for text in stream_chat_with_ai(message, context, info):
+                    parts.append(text)
+                    on_chunk(text)
+                ai_response = {"success": bool(parts), "response": "".join(parts), "model": info.get("provider")}
+            else:
+                ai_response = chat_with_ai(message, context, brownout.max_output_tokens())
+            ai_call.set(success=bool(ai_response.get("success")))
+        cascade.record("ai_chat", bool(ai_response.get("success")), started)
+        
+        if not ai_response.get("success"):
+            return None
+        return {
+            "status": "ok",
+            "response": ai_response["response"],
+            "type": "ai_chat",
+            "ai_powered": True,
+            "model": ai_response.get("model")
+        }
+    
+    @staticmethod
+    def is_question(msg_lower: str) -> bool:
+        first_word = msg_lower.split(" ", 1)[0]
+        return msg_lower.endswith("?") or first_word in QUESTION_WORDS
         
-        return cls.get_recommendation(best_choice, session_id)
+    @classmethod
+    def classify_and_recommend(cls, text: str, session_id: str, kb: Optional[KnowledgeBase] = None) -> Dict[str, Any]:
+        """Keyword, typo-tolerant and local-model classification (no AI call)"""
+        kb = kb or knowledge_base.current()
+        decision = cascade.classify_locally(text, kb)
+        if not decision["category"]:
+            return cls.clarification(decision)
+        return cls.recommend_from_decision(decision, session_id, kb)
+    
+    @classmethod
+    def recommend_from_decision(cls, decision: Dict[str, Any], session_id: str, kb: KnowledgeBase) -> Dict[str, Any]:
+        result = cls.get_recommendation(decision["category"], session_id, kb)
+        result["metadata"]["classification"] = {
+            **decision["classification"],
+            "tier": decision["tier"],
+            "confidence": decision["confidence"]
+        }
+        return result
+    
+    @staticmethod
+    def clarification(decision: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": "clarification_needed",
+            "response": "I'd love to help! Could you be more specific?\n\n1. 🌐 **Web Development** - Websites and web apps\n2. 📊 **Data Science** - Data analysis, ML, AI\n3. 📱 **Mobile Apps** - iOS/Android apps\n4. 🎮 **Game Development** - Video games\n\nWhich area interests you most?",
+            "type": "clarification",
+            "metadata": {"classification": {**decision["classification"], "tier": decision["tier"]}}
+        }
     
     @classmethod
-    def get_recommendation(cls, choice: str, session_id: str) -> Dict[str, Any]:
+    def get_recommendation(cls, choice: str, session_id: str, kb: Optional[KnowledgeBase] = None) -> Dict[str, Any]:
         """Get recommendation for choice"""
-        if choice not in cls.INTEREST_MAP:
+        kb = kb or knowledge_base.current()
+        result = kb.recommendation(choice, session_id)
+        if result is None:
             return {
                 "status": "error",
-                "message": "Invalid choice. Please select 1-4."
+                "message": f"Invalid choice. Please select 1-{len(kb.categories)}."
             }
-        
-        choice_data = cls.INTEREST_MAP[choice]
-        lang = choice_data["lang"]
-        
-        return {
-            "status": "ok",
-            "language": lang,
-            "reason": choice_data["reason"],
-            "resources": cls.RESOURCES_MAP.get(lang, []),
-            "metadata": {
-                "difficulty": choice_data["difficulty"],
-                "estimated_time": choice_data["time"],
-                "learning_path": choice_data["learning_path"],
-                "career_paths": choice_data["career_paths"],
-                "session_id": session_id
-            },
-            "type": "recommendation"
-        }
+        return result
+
+def get_client_ip(connection: HTTPConnection) -> Optional[str]:
+    """
+    Client IP for rate limiting. Hops left of the ones our proxies appended
+    are whatever the client sent, so they are never trusted.
+    """
+    if TRUSTED_PROXY_COUNT > 0:
+        hops = [hop.strip() for hop in connection.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_COUNT:
+            return hops[-TRUSTED_PROXY_COUNT]
+    return connection.client.host if connection.client else None
+
+def require_admin(request: Request):
+    """Reject the request unless it carries the configured X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if request.headers.get("x-admin-token") != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def learn_from_ai_classification(text: str, result: Dict[str, Any]):
+    """Feed AI classifications that name a known category to the local model"""
+    if knowledge_base.current().get(str(result.get("category", "")).strip()):
+        local_classifier.learn_from_ai(text, result)
+
+def learn_from_confirmed_choice(session: Session, choice: str):
+    """An explicit choice labels the user's last free-text message in that session"""
+    text = session.last_user_message()
+    if text:
+        local_classifier.learn(text, choice)
+
+async def save_local_model():
+    while True:
+        await asyncio.sleep(LOCAL_MODEL_SAVE_INTERVAL)
+        await run_in_threadpool(local_classifier.save_if_dirty)
+
+def check_ai() -> Dict[str, Any]:
+    if not AI_AVAILABLE:
+        return {"reachable": False, "reason": "disabled"}
+    return ai_helper.ping()
+
+def check_session_store() -> Dict[str, Any]:
+    return {"sessions": len(sessions)}
+
+async def refresh_quick_start():
+    """Periodically let the AI rewrite the quick-start intros"""
+    from ai_helper import chat_with_ai
+    while True:
+        await run_in_threadpool(quick_start.refresh_with_ai, knowledge_base.current(), chat_with_ai)
+        await asyncio.sleep(QUICK_START_AI_REFRESH)
+
+async def watch_load():
+    """Re-evaluate the brownout level from the latest loop lag and request counters"""
+    while True:
+        await asyncio.sleep(BROWNOUT_INTERVAL)
+        previous = brownout.level
+        level = brownout.evaluate(prober.loop_lag_ms)
+        if level != previous:
+            log = logger.warning if level > previous else logger.info
+            log(f"{'🔥' if level > previous else '✅'} Brownout level {previous} -> {level}: {brownout.stats()['mode']}")
+
+async def watch_knowledge_base():
+    """Reload the knowledge base when its file changes on disk"""
+    while True:
+        await asyncio.sleep(KB_WATCH_INTERVAL)
+        await run_in_threadpool(knowledge_base.reload_if_modified)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    if KB_WATCH_INTERVAL > 0:
+        asyncio.create_task(watch_knowledge_base())
+    
+    # An untrained local model starts from the KB keywords
+    local_classifier.seed(
+        (keyword, category.id)
+        for category in knowledge_base.current().categories.values()
+        for keyword in category.keywords
+    )
+    if AI_AVAILABLE:
+        ai_helper.add_classification_listener(learn_from_ai_classification)
+    if LOCAL_MODEL_SAVE_INTERVAL > 0:
+        asyncio.create_task(save_local_model())
+    if AI_AVAILABLE and QUICK_START_AI_REFRESH > 0:
+        asyncio.create_task(refresh_quick_start())
+    
+    # Probes read cached results; only this task touches the dependencies
+    prober.add_check("ai", check_ai)
+    prober.add_check("session_store", check_session_store)
+    asyncio.create_task(prober.sample_loop_lag())
+    asyncio.create_task(prober.run())
+    asyncio.create_task(watch_load())
+
+@app.on_event("shutdown")
+async def save_state():
+    await run_in_threadpool(local_classifier.save_if_dirty)
 
 # API ENDPOINTS
 
 @app.get("/health")
+@app.head("/health")  # Add HEAD method support
 async def health_check():
-    """Health check endpoint"""
+    """Health summary - supports both GET and HEAD (see /livez and /readyz for probes)"""
+    readiness = prober.readiness()
     return {
-        "status": "healthy",
+        "status": "healthy" if readiness["ready"] else "degraded",
         "service": "TechGuide Bot API - Advanced",
         "version": "3.0.0",
         "timestamp": datetime.now().isoformat(),
-        "ai_enabled": AI_AVAILABLE
+        "ai_enabled": AI_AVAILABLE,
+        "ai_reachable": readiness["checks"].get("ai", {}).get("reachable"),
+        "kb_version": knowledge_base.current().version,
+        "brownout": {"level": brownout.level, "mode": BROWNOUT_LEVELS[brownout.level]}
     }
 
-@app.get("/health")
-@app.head("/health")  # Add HEAD method support
-async def health_check():
-    """Health check endpoint - supports both GET and HEAD"""
+@app.get("/livez")
+@app.head("/livez")
+async def livez():
+    """Liveness: the process is up and the event loop answers. Does no other work."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+@app.head("/readyz")
+async def readyz():
+    """Readiness from the background prober's cached results; 503 when not ready"""
+    readiness = prober.readiness()
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content={"status": "ready" if readiness["ready"] else "not_ready", **readiness}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Operational counters"""
     return {
-        "status": "healthy",
-        "service": "TechGuide Bot API",
-        "version": "3.0.0",
-        "ai_enabled": AI_AVAILABLE
+        "status": "ok",
+        "timestamp": datetime.now().isoformat(),
+        "admission": admission.stats(),
+        "logging": {"dropped_records": DroppingQueueHandler.dropped},
+        "local_model": local_classifier.stats(),
+        "cascade": cascade.stats(),
+        "llm": ai_helper.router.stats() if AI_AVAILABLE else None,
+        "brownout": brownout.stats(),
+        "idempotency": idempotency.stats(),
+        "quick_start": {"served": quick_start.served}
+    }
+
+@app.get("/kb/snapshot")
+async def kb_snapshot(request: Request, since: Optional[str] = None):
+    """Versioned knowledge-base snapshot for offline clients (ETag = version)"""
+    snapshot = knowledge_base.current().snapshot()
+    etag = f'"{snapshot["version"]}"'
+    known = since or request.headers.get("if-none-match", "").strip('"')
+    if known == snapshot["version"]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        content=snapshot["body"],
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+@app.post("/admin/kb/reload")
+async def reload_knowledge_base(request: Request):
+    """Reload the knowledge base file now; in-flight requests keep the old version"""
+    require_admin(request)
+    previous = knowledge_base.current().version
+    try:
+        changed = await run_in_threadpool(knowledge_base.reload)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Reload failed, keeping {previous}: {e}")
+    return {
+        "status": "ok",
+        "changed": changed,
+        "previous_version": previous,
+        "kb_version": knowledge_base.current().version
     }
 
+def handle_chat_turn(message: str, session_id: str, session: Session,
+                     client_ip: Optional[str] = None,
+                     on_chunk: Optional[Callable[[str], None]] = None,
+                     received: Optional[float] = None) -> Dict[str, Any]:
+    """
+    One user turn: log, store, process and store the reply (blocking, run in
+    a worker thread). ``received`` is the perf_counter() when the turn
+    arrived; the wait until now feeds the brownout controller.
+    """
+    if received is not None:
+        brownout.record_queue_wait((time.perf_counter() - received) * 1000)
+    logger.info("chat_request", extra={
+        "session_id": session_id,
+        "message_preview": safe_message(message),
+        "message_chars": len(message),
+        "sampled": True
+    })
+    
+    # Store user message
+    with span("session_write", role="user"):
+        session.add_user_message(message)
+    
+    # Process message
+    with span("process_chat") as processing:
+        result = EnhancedBackend.process_chat(message, session_id, client_ip, on_chunk)
+        processing.set(result_type=result.get("type"))
+    
+    # Store bot response
+    with span("session_write", role="assistant"):
+        session.add_bot_message(result)
+    
+    result["session_id"] = session_id
+    analytics.record("chat", result)
+    return result
+
+def profile_mode(http_request: Request) -> Optional[str]:
+    """
+    Profiler for this request: the admin-only X-Profile header, or "sampling"
+    for a random PROFILE_SAMPLE_RATE fraction of requests, else None
+    """
+    mode = http_request.headers.get(PROFILE_HEADER)
+    if mode is None:
+        return "sampling" if should_sample() else None
+    require_admin(http_request)
+    if mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"X-Profile must be one of {', '.join(PROFILE_MODES)}")
+    return mode
+
+async def run_blocking(http_request: Request, mode: Optional[str], endpoint: str,
+                       fn: Callable[..., Dict[str, Any]], *args) -> Dict[str, Any]:
+    """
+    Run a blocking handler in the threadpool, under a profiler when mode is
+    set. The profile is kept on the request (see with_profile), never in
+    the result, which the idempotency cache may replay to other requests.
+    """
+    if mode is None:
+        return await run_in_threadpool(fn, *args)
+    result, profile = await run_in_threadpool(profile_call, mode, fn, *args)
+    path = await run_in_threadpool(store_profile, endpoint, profile, current_trace_id())
+    # Profiles asked for explicitly come back with the response; sampled ones are only stored
+    if PROFILE_HEADER in http_request.headers:
+        http_request.state.profile = {**profile, "stored_at": path}
+    return result
+
+def with_profile(http_request: Request, result: Dict[str, Any]) -> Dict[str, Any]:
+    """``result`` plus the profile this request itself recorded, if any (a copy)"""
+    profile = getattr(http_request.state, "profile", None)
+    return {**result, "profile": profile} if profile else result
+
+async def run_idempotent(http_request: Request, response: Response, endpoint: str,
+                         request_fingerprint: str,
+                         compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Run ``compute`` once per Idempotency-Key: retries get the stored result,
+    and a retry that arrives mid-flight waits for the original. Requests
+    without the header always run.
+    """
+    key = http_request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return with_profile(http_request, await compute())
+    if len(key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} is longer than {IDEMPOTENCY_MAX_KEY_LENGTH} characters")
+    try:
+        result, replayed = await idempotency.run(endpoint, key, request_fingerprint, compute)
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used with a different request")
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return with_profile(http_request, result)
+
 @app.post("/chat")
-async def chat(request: ChatRequest):
-    """Main chat endpoint"""
+async def chat(request: ChatRequest, http_request: Request, response: Response):
+    """Main chat endpoint; retries with the same Idempotency-Key do not run the turn twice"""
+    # Body parsing and validation happen between the middleware and here
+    record_span("validation", http_request.state.received, message_chars=len(request.message))
+    mode = profile_mode(http_request)
     try:
         session_id = request.session_id or str(uuid.uuid4())
+        # AI calls block, so the turn runs in the threadpool, not on the event loop
+        return await run_idempotent(
+            http_request, response, "chat", fingerprint(request.message, request.session_id),
+            lambda: run_blocking(
+                http_request, mode, "chat",
+                handle_chat_turn,
+                request.message,
+                session_id,
+                sessions[session_id],
+                get_client_ip(http_request),
+                None,
+                http_request.state.received
+            )
+        )
         
-        logger.info(f"Chat request - Session: {session_id}, Message: {request.message}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in chat: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.websocket("/ws/chat")
+async def ws_chat(websocket: WebSocket, session_id: Optional[str] = None):
+    """
+    Persistent chat channel. The session is bound once at connect.
+
+    Client -> server: {"type": "message", "message": "...", "trace_id": "..."} or {"type": "pong"}
+
+    A turn's trace_id is also its idempotency key, shared with POST /chat:
+    a client that gives up on the socket and resends the turn over HTTP
+    with the same key gets this turn's result instead of a second run.
+    Server -> client: {"type": "session"}, {"type": "chunk", "text": "..."},
+                      {"type": "response", "result": {...}}, {"type": "error"},
+                      {"type": "ping"}
+    """
+    await websocket.accept()
+    session_id = session_id or str(uuid.uuid4())
+    session = sessions[session_id]
+    client_ip = get_client_ip(websocket)
+    loop = asyncio.get_running_loop()
+    # Bounded inbox: when it is full the reader stops reading, which pushes
+    # back on the client through TCP flow control instead of queueing turns
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=WS_MAX_PENDING)
+    last_seen = loop.time()
+    
+    await websocket.send_json({"type": "session", "session_id": session_id})
+    
+    async def reader():
+        nonlocal last_seen
+        while True:
+            try:
+                frame = await websocket.receive_json()
+            except WebSocketDisconnect:
+                return
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Frames must be JSON"})
+                continue
+            last_seen = loop.time()
+            if not isinstance(frame, dict):
+                await websocket.send_json({"type": "error", "detail": "Frames must be JSON objects"})
+                continue
+            kind = frame.get("type", "message")
+            if kind == "pong":
+                continue
+            if kind == "ping":
+                await websocket.send_json({"type": "pong"})
+                continue
+            message = frame.get("message")
+            if not isinstance(message, str) or not message.strip():
+                await websocket.send_json({"type": "error", "detail": "message must be a non-empty string"})
+                continue
+            if len(message) > WS_MAX_MESSAGE_CHARS:
+                await websocket.send_json({"type": "error", "detail": f"message longer than {WS_MAX_MESSAGE_CHARS} characters"})
+                continue
+            trace_id = frame.get("trace_id")
+            await inbox.put((message, trace_id if isinstance(trace_id, str) else None, time.perf_counter()))
+    
+    async def pinger():
+        while True:
+            await asyncio.sleep(WS_PING_INTERVAL)
+            if loop.time() - last_seen > WS_PING_INTERVAL + WS_PONG_TIMEOUT:
+                await websocket.close(code=1001)
+                return
+            await websocket.send_json({"type": "ping"})
+    
+    async def run_turn(message: str, trace_id: Optional[str], received: float):
+        record_span("inbox_wait", received, message_chars=len(message))
+        chunks: asyncio.Queue = asyncio.Queue()
         
-        # Store user message
-        sessions[session_id]["messages"].append({
-            "role": "user",
-            "content": request.message,
-            "timestamp": datetime.now().isoformat()
-        })
+        def on_chunk(text: str):
+            loop.call_soon_threadsafe(chunks.put_nowait, text)
         
-        # Process message
-        result = EnhancedBackend.process_chat(request.message, session_id)
+        async def compute() -> Dict[str, Any]:
+            return await run_in_threadpool(
+                handle_chat_turn, message, session_id, session, client_ip, on_chunk, received
+            )
         
-        # Store bot response
-        sessions[session_id]["messages"].append({
-            "role": "assistant",
-            "content": result.get("response") or result.get("reason", ""),
-            "timestamp": datetime.now().isoformat(),
-            "data": result
-        })
+        async def keyed() -> Dict[str, Any]:
+            result, _ = await idempotency.run("chat", trace_id, fingerprint(message, session_id), compute)
+            return result
         
-        result["session_id"] = session_id
-        return result
+        use_key = bool(trace_id) and len(trace_id) <= IDEMPOTENCY_MAX_KEY_LENGTH
+        turn = asyncio.ensure_future(keyed() if use_key else compute())
+        # Forward streamed chunks while the turn runs; each send is awaited,
+        # so a slow client slows the stream rather than growing buffers
+        while not turn.done():
+            next_chunk = asyncio.ensure_future(chunks.get())
+            await asyncio.wait({next_chunk, turn}, return_when=asyncio.FIRST_COMPLETED)
+            if next_chunk.done():
+                await websocket.send_json({"type": "chunk", "text": next_chunk.result()})
+            else:
+                next_chunk.cancel()
+        while not chunks.empty():
+            await websocket.send_json({"type": "chunk", "text": chunks.get_nowait()})
         
+        try:
+            result = turn.result()
+        except IdempotencyConflict:
+            await websocket.send_json({"type": "error", "detail": "trace_id was already used with a different message"})
+            return
+        except Exception as e:
+            logger.error(f"Error in ws chat: {str(e)}")
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            return
+        await websocket.send_json({"type": "response", "result": result})
+    
+    async def worker():
+        while True:
+            message, trace_id, received = await inbox.get()
+            with span("WS /ws/chat turn", trace_id=trace_id, session_id=session_id):
+                await run_turn(message, trace_id, received)
+    
+    tasks = {
+        "reader": asyncio.ensure_future(reader()),
+        "worker": asyncio.ensure_future(worker()),
+        "pinger": asyncio.ensure_future(pinger())
+    }
+    try:
+        await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_COMPLETED)
     except Exception as e:
-        logger.error(f"Error in chat: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.warning(f"WebSocket session {session_id} ended: {e}")
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        # Collect every outcome, so a crashed task is logged rather than lost
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for name, outcome in zip(tasks, outcomes):
+            if isinstance(outcome, Exception) and not isinstance(outcome, WebSocketDisconnect):
+                logger.error(f"❌ WebSocket session {session_id}: {name} failed: {outcome!r}")
+        try:
+            await websocket.close()
+        except (RuntimeError, WebSocketDisconnect, OSError):
+            # Already closed by the client or by the pinger
+            pass
 
-@app.post("/techguide")
-async def get_recommendation(request: TechGuideRequest):
-    """Get programming language recommendation"""
-    try:
-        session_id = request.session_id or str(uuid.uuid4())
-        
+def handle_techguide(request: TechGuideRequest, session_id: str) -> Dict[str, Any]:
+    """Recommendation for an explicit choice or free text, and its bookkeeping (blocking)"""
+    kb = knowledge_base.current()
+    
+    with span("classification", explicit_choice=bool(request.choice)):
         if request.choice:
-            result = EnhancedBackend.get_recommendation(request.choice, session_id)
+            result = EnhancedBackend.get_recommendation(request.choice, session_id, kb)
         elif request.message:
-            result = EnhancedBackend.classify_and_recommend(request.message, session_id)
+            result = EnhancedBackend.classify_and_recommend(request.message, session_id, kb)
         else:
             return {"status": "error", "message": "Provide either choice or message"}
+    
+    # Store recommendation; an explicit choice is a confirmed label
+    if result.get("status") == "ok" and result.get("language"):
+        with span("session_write"):
+            if request.choice and session_id in sessions:
+                learn_from_confirmed_choice(sessions[session_id], request.choice)
+            sessions[session_id].add_recommendation(result["language"])
+    analytics.record("techguide", result)
+    return result
+
+@app.post("/techguide")
+async def get_recommendation(request: TechGuideRequest, http_request: Request, response: Response):
+    """Get programming language recommendation (Idempotency-Key aware, like /chat)"""
+    record_span("validation", http_request.state.received)
+    mode = profile_mode(http_request)
+    try:
+        session_id = request.session_id or str(uuid.uuid4())
+        return await run_idempotent(
+            http_request, response, "techguide",
+            fingerprint(request.choice, request.message, request.session_id),
+            lambda: run_blocking(http_request, mode, "techguide", handle_techguide, request, session_id)
+        )
         
-        # Store recommendation
-        if result.get("status") == "ok" and result.get("language"):
-            sessions[session_id]["recommendations"].append({
-                "language": result["language"],
-                "timestamp": datetime.now().isoformat()
-            })
-        
-        return result
-        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in recommendation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/quick-start")
+async def list_quick_start():
+    """Canned quick-start intents the frontend can request by id"""
+    return {"intents": quick_start.list_intents()}
+
+@app.post("/quick-start/{intent_id}")
+async def run_quick_start(intent_id: str, request: QuickStartRequest, http_request: Request):
+    """One quick-start turn, stored in the session like a chat turn; answered from memory"""
+    intent = quick_start.intents.get(intent_id)
+    if intent is None:
+        raise HTTPException(status_code=404, detail=f"Unknown quick-start intent: {intent_id}")
+    session_id = request.session_id or str(uuid.uuid4())
+    # Still a worker thread: if the intent's category left the KB this becomes a normal turn
+    return await run_in_threadpool(
+        handle_chat_turn, intent.message, session_id, sessions[session_id], get_client_ip(http_request),
+        None, http_request.state.received
+    )
+
 @app.get("/history/{session_id}")
 async def get_history(session_id: str):
     """Get conversation history"""
@@ -508,12 +768,78 @@ async def get_history(session_id: str):
             "recommendations": []
         }
     
+    # Stored records are compact; full payloads are rebuilt from the knowledge base here
     return {
         "status": "ok",
         "session_id": session_id,
-        **sessions[session_id]
+        **sessions[session_id].to_dict(session_id)
     }
 
+@app.get("/traces")
+async def list_traces(request: Request, limit: int = 50, min_duration_ms: float = 0.0,
+                      name: Optional[str] = None):
+    """Most recent traces (root spans), optionally only those slower than min_duration_ms"""
+    require_admin(request)
+    return {
+        "status": "ok",
+        "buffered_spans": len(exporter),
+        "traces": exporter.recent_roots(min(limit, 500), min_duration_ms, name)
+    }
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, request: Request):
+    """Every buffered span of one trace, in start order"""
+    require_admin(request)
+    spans = exporter.trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found (unknown or already evicted)")
+    return {"status": "ok", "trace_id": trace_id, "spans": spans}
+
+@app.get("/stats")
+async def stats(window: int = 3600):
+    """Usage rollups for the last `window` seconds (answered from counters, not by scanning sessions)"""
+    if window <= 0:
+        raise HTTPException(status_code=400, detail="window must be a positive number of seconds")
+    return {"status": "ok", **analytics.stats(window)}
+
+def parse_time_bound(value: Optional[str], name: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 timestamp")
+
+def iter_session_export(since: Optional[datetime], until: Optional[datetime]) -> Iterator[str]:
+    """
+    One NDJSON line per session, built lazily. Only the id list is copied up
+    front; each session's lists are copied when its turn comes, so writers
+    are never blocked and the full store is never held twice in memory.
+    """
+    since_ts = since.timestamp() if since else None
+    until_ts = until.timestamp() if until else None
+    for session_id in list(sessions.keys()):
+        session = sessions.get(session_id)
+        if session is None:
+            continue
+        data = session.to_dict(session_id, since_ts, until_ts)
+        if (since or until) and not data["messages"] and not data["recommendations"]:
+            continue
+        yield json.dumps({"session_id": session_id, **data}, default=str, ensure_ascii=False) + "\n"
+
+@app.get("/sessions/export")
+async def export_sessions(request: Request, since: Optional[str] = None, until: Optional[str] = None):
+    """Stream every session as NDJSON; since/until (ISO 8601) keep only activity in [since, until)"""
+    require_admin(request)
+    since_dt = parse_time_bound(since, "since")
+    until_dt = parse_time_bound(until, "until")
+    # A sync generator is iterated in the threadpool, off the event loop
+    return StreamingResponse(
+        iter_session_export(since_dt, until_dt),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=sessions.ndjson"}
+    )
+
 @app.get("/")
 async def root():
     """API root"""
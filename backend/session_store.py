@@ -0,0 +1,165 @@
+"""
+Session storage for TechGuide Bot
+Compact per-message records: recommendations are stored as a category id
+plus the knowledge-base version and rehydrated only when serialized.
+"""
+
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from cascade import ConversationScores
+from knowledge_base import knowledge_base
+
+# Keys of a recommendation payload that come from the knowledge base
+_KB_KEYS = frozenset({"status", "language", "reason", "resources", "metadata", "type"})
+# Classification metadata kept per message (scores and keyword lists are dropped)
+_CLASSIFICATION_KEYS = ("tier", "source", "confidence")
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts).isoformat()
+
+# Per-message extras repeat a handful of shapes ({"status": "ok", "type": "ai_chat", ...});
+# identical ones share a single dict, which is never mutated
+_SHARED_EXTRAS: Dict[Tuple, Dict[str, Any]] = {}
+_MAX_SHARED_EXTRAS = 1024
+
+def _share(extra: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not extra:
+        return None
+    try:
+        key = tuple(sorted(extra.items()))
+        hash(key)
+    except TypeError:
+        return extra
+    shared = _SHARED_EXTRAS.get(key)
+    if shared is None:
+        if len(_SHARED_EXTRAS) >= _MAX_SHARED_EXTRAS:
+            return extra
+        shared = _SHARED_EXTRAS.setdefault(key, extra)
+    return shared
+
+def _compact_classification(metadata: Optional[Dict[str, Any]]) -> Optional[Tuple]:
+    classification = (metadata or {}).get("classification")
+    if not classification:
+        return None
+    return tuple(classification.get(key) for key in _CLASSIFICATION_KEYS)
+
+class MessageRecord:
+    """
+    One chat message. ``content`` is None for recommendations, whose text
+    is their stored "response" if they had one, else the category's reason; ``classification`` is a (tier, source,
+    confidence) tuple and ``extra`` holds the remaining per-message fields
+    (type, ai_powered, degraded, ...), shared between identical messages.
+    """
+
+    __slots__ = ("role", "content", "ts", "category_id", "kb_version", "classification", "extra")
+
+    def __init__(self, role: str, content: Optional[str], ts: float,
+                 category_id: Optional[str] = None, kb_version: Optional[str] = None,
+                 classification: Optional[Tuple] = None, extra: Optional[Dict[str, Any]] = None):
+        self.role = role
+        self.content = content
+        self.ts = ts
+        self.category_id = category_id
+        self.kb_version = kb_version
+        self.classification = classification
+        self.extra = extra
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any], ts: float) -> "MessageRecord":
+        metadata = result.get("metadata") or {}
+        category_id = metadata.get("category_id") if result.get("type") == "recommendation" else None
+        classification = _compact_classification(metadata)
+        if category_id is not None:
+            # The version the payload was built from; a reload may have happened since
+            version = metadata.get("kb_version") or knowledge_base.current().version
+            return cls(
+                "assistant", None, ts, category_id,
+                # Interned so thousands of records share one version string
+                sys.intern(version),
+                classification,
+                _share({k: v for k, v in result.items() if k not in _KB_KEYS and k != "session_id"})
+            )
+        return cls(
+            "assistant", result.get("response") or result.get("reason", ""), ts,
+            classification=classification,
+            extra=_share({k: v for k, v in result.items() if k not in ("response", "metadata", "session_id")})
+        )
+
+    def text(self) -> str:
+        if self.content is not None:
+            return self.content
+        # Quick-start and AI intros replace the category's reason as the message text
+        if self.extra and self.extra.get("response"):
+            return self.extra["response"]
+        category = knowledge_base.get_version(self.kb_version).get(self.category_id)
+        return category.reason if category else ""
+
+    def to_dict(self, session_id: str) -> Dict[str, Any]:
+        """Rehydrate the message in the shape /history has always returned"""
+        message = {"role": self.role, "content": self.text(), "timestamp": _iso(self.ts)}
+        if self.role != "assistant":
+            return message
+
+        if self.category_id is not None:
+            kb = knowledge_base.get_version(self.kb_version)
+            data = kb.recommendation(self.category_id, session_id) or {"status": "error", "type": "recommendation"}
+        else:
+            data = {"response": self.content}
+        data.update(self.extra or {})
+        if self.classification:
+            data.setdefault("metadata", {})["classification"] = {
+                key: value for key, value in zip(_CLASSIFICATION_KEYS, self.classification) if value is not None
+            }
+        data["session_id"] = session_id
+        message["data"] = data
+        return message
+
+class Session:
+    """Messages and recommendations of one session; timestamps are epoch seconds"""
+
+    __slots__ = ("created_at", "messages", "recommendations", "context")
+
+    def __init__(self):
+        self.created_at = time.time()
+        self.messages: List[MessageRecord] = []
+        # (language, ts) pairs
+        self.recommendations: List[Tuple[str, float]] = []
+        # Keyword evidence of the turns since the last recommendation
+        self.context = ConversationScores()
+
+    def add_user_message(self, content: str):
+        self.messages.append(MessageRecord("user", content, time.time()))
+
+    def add_bot_message(self, result: Dict[str, Any]):
+        self.messages.append(MessageRecord.from_result(result, time.time()))
+
+    def add_recommendation(self, language: str):
+        self.recommendations.append((sys.intern(language), time.time()))
+
+    def last_user_message(self) -> Optional[str]:
+        for record in reversed(self.messages):
+            if record.role == "user":
+                return record.content
+        return None
+
+    def to_dict(self, session_id: str, since: Optional[float] = None,
+                until: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Serialized session; with since/until (epoch seconds) only the
+        activity in [since, until) is included. Lists are copied first so
+        concurrent appends never break the iteration.
+        """
+        def in_range(ts: float) -> bool:
+            return (since is None or ts >= since) and (until is None or ts < until)
+
+        return {
+            "created_at": _iso(self.created_at),
+            "messages": [m.to_dict(session_id) for m in list(self.messages) if in_range(m.ts)],
+            "recommendations": [
+                {"language": language, "timestamp": _iso(ts)}
+                for language, ts in list(self.recommendations) if in_range(ts)
+            ]
+        }
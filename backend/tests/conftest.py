@@ -0,0 +1,9 @@
+"""
+Backend modules import each other as top-level modules (``from cascade
+import cascade``), as they do when the server runs from backend/.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
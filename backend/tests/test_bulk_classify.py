@@ -0,0 +1,81 @@
+import io
+import json
+import random
+import time
+
+import pytest
+
+import bulk_classify
+from bulk_classify import BulkClassifier, InputError, chunked, read_items
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_text_lines_skip_blanks_but_keep_numbering(tmp_path):
+    path = write(tmp_path / "in.txt", "build websites\n\n  \nmake games\n")
+    items = list(read_items([path], None, "text", None))
+    assert [(record, text) for record, _, text, _ in items] == [(1, "build websites"), (4, "make games")]
+
+def test_ndjson_errors_are_reported_per_record(tmp_path):
+    path = write(tmp_path / "in.ndjson", '{"text": "a", "uid": 7}\nnot json\n[1]\n{"text": 5}\n{"other": "x"}\n"plain"\n')
+    items = list(read_items([path], None, "text", "uid"))
+    assert items[0] == (1, "7", "a", None)
+    assert items[1][3].startswith("invalid JSON")
+    assert items[2][3] == "not an object or a string"
+    assert items[3][3] == "text is not a string"
+    assert items[4][3] == "text missing"
+    assert items[5] == (6, None, "plain", None)
+
+def test_csv_rows_and_short_rows(tmp_path):
+    path = write(tmp_path / "in.csv", "uid,text\nu1,make games\nu2\n")
+    items = list(read_items([path], None, "text", "uid"))
+    assert items == [(1, "u1", "make games", None), (2, "u2", None, "text missing")]
+
+def test_csv_without_the_field_is_fatal(tmp_path):
+    path = write(tmp_path / "in.csv", "uid,text\nu1,make games\n")
+    with pytest.raises(InputError):
+        list(read_items([path], None, "message", None))
+
+def test_missing_input_is_fatal(tmp_path):
+    with pytest.raises(InputError):
+        list(read_items([str(tmp_path / "nope.txt")], None, "text", None))
+
+def test_records_are_numbered_across_inputs(tmp_path):
+    first = write(tmp_path / "a.txt", "one\ntwo\n")
+    second = write(tmp_path / "b.txt", "three\n")
+    assert [item[0] for item in read_items([first, second], None, "text", None)] == [1, 2, 3]
+
+def test_chunked_splits_lazily():
+    chunks = chunked(iter([(i, None, "x", None) for i in range(5)]), 2)
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+def run(items, chunk_size=3, **kwargs):
+    out = io.StringIO()
+    summary = BulkClassifier(out, progress_interval=0, **kwargs).run(chunked(iter(items), chunk_size))
+    return [json.loads(line) for line in out.getvalue().splitlines()], summary
+
+def test_output_is_in_input_order_with_a_process_pool():
+    texts = ["I want to build websites", "machine learning with pandas", "hmm", "make games in unity"]
+    items = [(i, None, texts[i % len(texts)], None) for i in range(1, 41)]
+    items.append((41, None, None, "text missing"))
+    results, summary = run(items, workers=2)
+    assert [result["record"] for result in results] == list(range(1, 42))
+    assert results[0]["language"] and results[0]["tier"] == "exact"
+    assert results[-1] == {"record": 41, "error": "text missing"}
+    assert summary["records"] == 41 and summary["errors"] == 1
+
+def test_ai_answers_keep_input_order(monkeypatch):
+    calls = []
+
+    def fake_ai(text):
+        calls.append(text)
+        time.sleep(random.random() / 100)
+        return {"category": "2", "tier": "ai_classify", "confidence": 0.9, "classification": {"source": "ai"}}
+
+    monkeypatch.setattr(bulk_classify, "classify_with_ai", fake_ai)
+    items = [(i, None, "hmm" if i % 2 else "I want to build websites", None) for i in range(1, 21)]
+    results, summary = run(items, workers=1, ai_concurrency=4)
+    assert [result["record"] for result in results] == list(range(1, 21))
+    assert len(calls) == summary["ai_calls"] == 10
+    assert all(result["tier"] == "ai_classify" for result in results[0::2])
@@ -0,0 +1,41 @@
+from fuzzy_index import FuzzyIndex, edit_distance
+
+VOCABULARY = ["python", "javascript", "science", "website", "kotlin", "android", "web", "game"]
+
+def test_edit_distance_counts_transpositions_as_one_edit():
+    assert edit_distance("pyhton", "python", 2) == 1
+    assert edit_distance("python", "python", 1) == 0
+    assert edit_distance("kitten", "sitting", 3) == 3
+
+def test_edit_distance_gives_up_past_limit():
+    assert edit_distance("python", "kotlin", 1) == 2
+    assert edit_distance("a", "abcdef", 2) == 3
+
+def test_short_words_are_not_indexed():
+    index = FuzzyIndex(VOCABULARY)
+    assert "web" not in index
+    assert "python" in index
+
+def test_one_typo_is_corrected():
+    index = FuzzyIndex(VOCABULARY)
+    assert index.lookup("pyhton") == ("python", 1)
+    assert index.lookup("websit") == ("website", 1)
+
+def test_long_tokens_allow_two_edits():
+    index = FuzzyIndex(VOCABULARY)
+    assert index.lookup("javscrpit") == ("javascript", 2)
+
+def test_short_tokens_allow_at_most_one_edit():
+    index = FuzzyIndex(VOCABULARY)
+    # Six characters, two edits from "python"
+    assert index.lookup("pthnoo") is None
+
+def test_no_lookup_for_exact_short_or_non_alpha_tokens():
+    index = FuzzyIndex(VOCABULARY)
+    assert index.lookup("python") is None
+    assert index.lookup("gmae") is None
+    assert index.lookup("pyth0n") is None
+
+def test_ties_break_alphabetically():
+    index = FuzzyIndex(["abcdef", "abcdeg"])
+    assert index.lookup("abcdex") == ("abcdef", 1)
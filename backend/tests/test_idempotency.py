@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from idempotency import IdempotencyCache, IdempotencyConflict, fingerprint
+
+def counting(result=None, delay=0.0, error=None):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return dict(result or {"response": "ok"})
+
+    return compute, calls
+
+def test_completed_result_is_replayed():
+    async def scenario():
+        cache = IdempotencyCache()
+        compute, calls = counting()
+        first = await cache.run("chat", "k", fingerprint("hi"), compute)
+        second = await cache.run("chat", "k", fingerprint("hi"), compute)
+        return first, second, calls, cache.stats()
+
+    first, second, calls, stats = asyncio.run(scenario())
+    assert first == ({"response": "ok"}, False)
+    assert second == ({"response": "ok"}, True)
+    assert len(calls) == 1
+    assert stats["computed"] == 1 and stats["replayed"] == 1
+
+def test_duplicates_in_flight_attach_to_the_original():
+    async def scenario():
+        cache = IdempotencyCache()
+        compute, calls = counting(delay=0.05)
+        results = await asyncio.gather(*[cache.run("chat", "k", fingerprint("hi"), compute) for _ in range(3)])
+        return results, calls, cache.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [replayed for _, replayed in results] == [False, True, True]
+    assert stats["attached"] == 2
+
+def test_endpoints_have_separate_key_spaces():
+    async def scenario():
+        cache = IdempotencyCache()
+        compute, calls = counting()
+        await cache.run("chat", "k", fingerprint("hi"), compute)
+        await cache.run("techguide", "k", fingerprint("hi"), compute)
+        return calls
+
+    assert len(asyncio.run(scenario())) == 2
+
+def test_key_reused_with_another_body_conflicts():
+    async def scenario():
+        cache = IdempotencyCache()
+        compute, _ = counting()
+        await cache.run("chat", "k", fingerprint("hi", None), compute)
+        await cache.run("chat", "k", fingerprint("bye", None), compute)
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(scenario())
+
+def test_failures_are_not_cached():
+    async def scenario():
+        cache = IdempotencyCache()
+        failing, _ = counting(error=RuntimeError("boom"))
+        with pytest.raises(RuntimeError):
+            await cache.run("chat", "k", fingerprint("hi"), failing)
+        await asyncio.sleep(0)
+        compute, calls = counting()
+        result = await cache.run("chat", "k", fingerprint("hi"), compute)
+        return result, calls
+
+    result, calls = asyncio.run(scenario())
+    assert result == ({"response": "ok"}, False)
+    assert len(calls) == 1
+
+def test_results_expire_after_the_ttl():
+    async def scenario():
+        cache = IdempotencyCache(ttl=0.01)
+        compute, calls = counting()
+        await cache.run("chat", "k", fingerprint("hi"), compute)
+        await asyncio.sleep(0.02)
+        _, replayed = await cache.run("chat", "k", fingerprint("hi"), compute)
+        return replayed, calls
+
+    replayed, calls = asyncio.run(scenario())
+    assert not replayed
+    assert len(calls) == 2
+
+def test_cache_is_bounded():
+    async def scenario():
+        cache = IdempotencyCache(max_keys=2)
+        compute, calls = counting()
+        for key in ("a", "b", "c"):
+            await cache.run("chat", key, fingerprint("hi"), compute)
+        stats = cache.stats()
+        # "a" was evicted, so it runs again
+        await cache.run("chat", "a", fingerprint("hi"), compute)
+        return stats, calls
+
+    stats, calls = asyncio.run(scenario())
+    assert stats["keys"] == 2
+    assert len(calls) == 4
+
+def test_cancelled_caller_does_not_cancel_the_turn():
+    async def scenario():
+        cache = IdempotencyCache()
+        compute, calls = counting(delay=0.05)
+        first = asyncio.ensure_future(cache.run("chat", "k", fingerprint("hi"), compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await cache.run("chat", "k", fingerprint("hi"), compute)
+        return result, calls
+
+    result, calls = asyncio.run(scenario())
+    assert result == ({"response": "ok"}, True)
+    assert len(calls) == 1
+
+def test_in_flight_entry_does_not_block_expiry():
+    async def scenario():
+        cache = IdempotencyCache(ttl=0.01)
+        slow, _ = counting(delay=0.1)
+        pending = asyncio.ensure_future(cache.run("chat", "slow", fingerprint("hi"), slow))
+        await asyncio.sleep(0)
+        compute, _ = counting()
+        await cache.run("chat", "done", fingerprint("hi"), compute)
+        await asyncio.sleep(0.02)
+        # Any new key prunes; "done" expired behind the in-flight "slow"
+        await cache.run("chat", "new", fingerprint("hi"), compute)
+        keys = set(cache._entries)
+        await pending
+        return keys
+
+    assert asyncio.run(scenario()) == {("chat", "slow"), ("chat", "new")}
+
+def test_completed_entries_are_evicted_before_in_flight_ones():
+    async def scenario():
+        cache = IdempotencyCache(max_keys=2)
+        slow, slow_calls = counting(delay=0.05)
+        pending = asyncio.ensure_future(cache.run("chat", "slow", fingerprint("hi"), slow))
+        await asyncio.sleep(0)
+        compute, _ = counting()
+        for key in ("a", "b"):
+            await cache.run("chat", key, fingerprint("hi"), compute)
+        # Still attached to the original turn, not recomputed
+        _, replayed = await cache.run("chat", "slow", fingerprint("hi"), slow)
+        await pending
+        return replayed, slow_calls, cache.stats()
+
+    replayed, slow_calls, stats = asyncio.run(scenario())
+    assert replayed
+    assert len(slow_calls) == 1
+    assert stats["keys"] == 2
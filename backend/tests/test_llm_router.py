@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+import llm_router
+from llm_router import LLMRouter, Provider, StubProvider, parse_stub
+
+class Fixed(Provider):
+    """Answers (or fails) after a fixed delay and logs every call"""
+
+    def __init__(self, name, latency=0.0, fail=False, calls=None):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.calls = calls if calls is not None else []
+
+    def complete(self, prompt, max_tokens=None):
+        self.calls.append(self.name)
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        return self.name
+
+    def ping(self):
+        self.calls.append(f"ping {self.name}")
+
+@pytest.fixture(autouse=True)
+def no_exploration(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_EXPLORE_RATE", 0.0)
+
+def seed(router, name, latency_ms, samples=20, failures=0):
+    profile = router._profiles[name]
+    for _ in range(samples):
+        profile.record(latency_ms, True, time.time())
+    for _ in range(failures):
+        profile.outcomes.append(False)
+
+def test_parse_stub():
+    stub = parse_stub("stub/fast:0.01:0.2")
+    assert (stub.name, stub.mean_latency, stub.error_rate) == ("stub/fast", 0.01, 0.2)
+    assert parse_stub("stub/plain").mean_latency == 0.05
+
+def test_ranked_by_expected_latency():
+    router = LLMRouter([Fixed("slow"), Fixed("flaky"), Fixed("fast")])
+    seed(router, "slow", 50)
+    seed(router, "fast", 10)
+    # 10 ms at a 50% error rate is expected to take 20 ms
+    seed(router, "flaky", 10, failures=20)
+    assert [p.name for p in router.ranked()] == ["fast", "flaky", "slow"]
+
+def test_cooldown_after_consecutive_failures(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_MAX_CONSECUTIVE_FAILURES", 2)
+    router = LLMRouter([StubProvider("bad", 0, 1.0), StubProvider("good", 0, 0.0)])
+    for _ in range(2):
+        assert router.complete("hi")["attempts"] == 2
+    assert [p.name for p in router.ranked()] == ["good", "bad"]
+    assert router.stats()["providers"]["bad"]["healthy"] is False
+    assert router.complete("hi") == {"text": "[good] hi", "provider": "good", "attempts": 1, "hedged": False}
+
+def test_failover_follows_ranking():
+    calls = []
+    router = LLMRouter([Fixed("c", calls=calls), Fixed("a", fail=True, calls=calls), Fixed("b", fail=True, calls=calls)])
+    seed(router, "a", 1)
+    seed(router, "b", 2)
+    seed(router, "c", 3)
+    result = router.complete("hi")
+    assert calls == ["a", "b", "c"]
+    assert (result["provider"], result["attempts"]) == ("c", 3)
+
+def test_all_failing_raises_last_error():
+    router = LLMRouter([Fixed("a", fail=True), Fixed("b", fail=True)])
+    with pytest.raises(RuntimeError, match="b failed"):
+        router.complete("hi")
+
+def test_hedged_backup_wins_past_p95():
+    router = LLMRouter([Fixed("primary", latency=0.3), Fixed("backup")], hedge=True)
+    seed(router, "primary", 1)
+    seed(router, "backup", 5)
+    result = router.complete("hi")
+    assert (result["provider"], result["hedged"]) == ("backup", True)
+    assert router.hedged_calls == 1
+    assert router.stats()["providers"]["backup"]["hedges_won"] == 1
+
+def test_no_hedge_before_enough_samples():
+    router = LLMRouter([Fixed("primary", latency=0.05), Fixed("backup")], hedge=True)
+    seed(router, "primary", 1, samples=llm_router.LLM_HEDGE_MIN_SAMPLES - 1)
+    seed(router, "backup", 5)
+    result = router.complete("hi")
+    assert (result["provider"], result["hedged"]) == ("primary", False)
+
+def test_hedge_backup_is_not_called_again_on_failover():
+    calls = []
+    router = LLMRouter([
+        Fixed("primary", latency=0.05, fail=True, calls=calls),
+        Fixed("backup", fail=True, calls=calls),
+        Fixed("last", calls=calls)
+    ], hedge=True)
+    seed(router, "primary", 1)
+    seed(router, "backup", 2)
+    seed(router, "last", 3)
+    result = router.complete("hi")
+    assert result["provider"] == "last"
+    assert calls.count("backup") == 1
+
+def test_ping_skips_exploration(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_EXPLORE_RATE", 1.0)
+    calls = []
+    router = LLMRouter([Fixed("slow", calls=calls), Fixed("fast", calls=calls)])
+    seed(router, "slow", 50)
+    seed(router, "fast", 10)
+    for _ in range(20):
+        assert router.ping()["provider"] == "fast"
+    assert set(calls) == {"ping fast"}
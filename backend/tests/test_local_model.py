@@ -0,0 +1,84 @@
+import gzip
+import json
+
+import pytest
+
+import local_model
+from local_model import LocalClassifier, NaiveBayesModel, hashed_features
+
+EXAMPLES = [
+    ("build websites with react", "1"),
+    ("frontend web pages and css", "1"),
+    ("machine learning with pandas", "2"),
+    ("data analysis and statistics", "2"),
+]
+
+def trained_model() -> NaiveBayesModel:
+    model = NaiveBayesModel(n_features=2 ** 12)
+    for text, label in EXAMPLES:
+        model.learn(text, label)
+    return model
+
+def test_features_are_stable_unigrams_and_bigrams():
+    features = hashed_features("Data Science", 2 ** 12)
+    assert len(features) == 3
+    assert features == hashed_features("data science", 2 ** 12)
+
+def test_empty_text_is_not_learned():
+    model = NaiveBayesModel()
+    assert not model.learn("!!!", "1")
+    assert model.examples == 0
+    assert model.predict("anything") == {}
+
+def test_prediction_is_a_distribution_favouring_the_right_class():
+    probabilities = trained_model().predict("react websites")
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+    assert max(probabilities, key=probabilities.get) == "1"
+    assert trained_model().predict("pandas statistics")["2"] > 0.5
+
+def test_round_trip_keeps_predictions():
+    model = trained_model()
+    model.seeded = 1
+    restored = NaiveBayesModel.from_dict(json.loads(json.dumps(model.to_dict())))
+    assert restored.seeded == 1
+    assert restored.docs == model.docs
+    assert restored.predict("css pages") == pytest.approx(model.predict("css pages"))
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        NaiveBayesModel.from_dict({"format": 99})
+
+def test_classifier_abstains_until_trained(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_model, "LOCAL_MODEL_MIN_EXAMPLES", 4)
+    monkeypatch.setattr(local_model, "LOCAL_MODEL_MIN_CONFIDENCE", 0.5)
+    classifier = LocalClassifier(str(tmp_path / "model.json.gz"))
+    classifier.seed(EXAMPLES)
+    # Seeded examples do not count as training
+    assert classifier.predict("react websites") is None
+    for text, label in EXAMPLES:
+        classifier.learn(text, label)
+    label, probability, _ = classifier.predict("react websites")
+    assert label == "1" and probability >= 0.5
+
+def test_low_confidence_ai_results_are_not_learned(tmp_path):
+    classifier = LocalClassifier(str(tmp_path / "model.json.gz"))
+    classifier.learn_from_ai("rust systems", {"category": "6", "confidence": 0.1})
+    classifier.learn_from_ai("rust systems", {"category": "6", "confidence": "bad"})
+    assert classifier.model.examples == 0
+    classifier.learn_from_ai("rust systems", {"category": "6", "confidence": 0.9})
+    assert classifier.model.docs == {"6": 1}
+
+def test_save_and_reload(tmp_path):
+    path = tmp_path / "model.json.gz"
+    classifier = LocalClassifier(str(path))
+    assert not classifier.save_if_dirty()
+    classifier.learn("build websites", "1")
+    assert classifier.save_if_dirty()
+    assert not classifier.save_if_dirty()
+    assert LocalClassifier(str(path)).model.docs == {"1": 1}
+
+def test_unreadable_file_starts_empty(tmp_path):
+    path = tmp_path / "model.json.gz"
+    with gzip.open(path, "wt") as f:
+        f.write("not json")
+    assert LocalClassifier(str(path)).model.examples == 0
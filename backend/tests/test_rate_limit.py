@@ -0,0 +1,60 @@
+from rate_limit import AdmissionController, KeyedRateLimiter
+
+def test_bucket_allows_burst_then_refills():
+    limiter = KeyedRateLimiter(rate_per_min=60, burst=2)
+    assert limiter.try_acquire("a", now=0.0)
+    assert limiter.try_acquire("a", now=0.0)
+    assert not limiter.try_acquire("a", now=0.0)
+    # One token per second at 60/min
+    assert not limiter.try_acquire("a", now=0.5)
+    assert limiter.try_acquire("a", now=1.5)
+
+def test_refill_is_capped_at_burst():
+    limiter = KeyedRateLimiter(rate_per_min=60, burst=2)
+    limiter.try_acquire("a", now=0.0)
+    for _ in range(2):
+        assert limiter.try_acquire("a", now=1000.0)
+    assert not limiter.try_acquire("a", now=1000.0)
+
+def test_keys_are_independent():
+    limiter = KeyedRateLimiter(rate_per_min=1, burst=1)
+    assert limiter.try_acquire("a", now=0.0)
+    assert not limiter.try_acquire("a", now=0.0)
+    assert limiter.try_acquire("b", now=0.0)
+
+def test_least_recently_used_key_is_evicted():
+    limiter = KeyedRateLimiter(rate_per_min=1, burst=1, max_keys=2)
+    limiter.try_acquire("a", now=0.0)
+    limiter.try_acquire("b", now=0.0)
+    # Touch "a" so "b" is the oldest
+    limiter.try_acquire("a", now=0.0)
+    limiter.try_acquire("c", now=0.0)
+    assert len(limiter) == 2
+    # "b" was evicted and comes back with a full bucket
+    assert limiter.try_acquire("b", now=0.0)
+
+def test_available_does_not_take_a_token():
+    limiter = KeyedRateLimiter(rate_per_min=1, burst=1)
+    assert limiter.available("a", now=0.0)
+    assert limiter.available("a", now=0.0)
+    assert limiter.try_acquire("a", now=0.0)
+    assert not limiter.available("a", now=0.0)
+
+def test_rejected_admission_takes_no_tokens():
+    admission = AdmissionController()
+    admission.global_budget = KeyedRateLimiter(rate_per_min=60, burst=0, max_keys=1)
+    assert not admission.admit_ai("session", "10.0.0.1")
+    assert admission.counters["throttled_global"] == 1
+    assert admission.per_ip._buckets["10.0.0.1"].tokens == admission.per_ip.burst
+    assert admission.per_session._buckets["session"].tokens == admission.per_session.burst
+
+def test_session_throttle_leaves_ip_budget_intact():
+    admission = AdmissionController()
+    admission.per_session = KeyedRateLimiter(rate_per_min=1, burst=1)
+    assert admission.admit_ai("session", "10.0.0.1")
+    ip_tokens = admission.per_ip._buckets["10.0.0.1"].tokens
+    assert not admission.admit_ai("session", "10.0.0.1")
+    assert admission.counters["throttled_session"] == 1
+    assert admission.per_ip._buckets["10.0.0.1"].tokens >= ip_tokens
+    # Another session from the same IP still gets through
+    assert admission.admit_ai("other", "10.0.0.1")
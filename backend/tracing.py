@@ -0,0 +1,163 @@
+"""
+Request tracing for TechGuide Bot
+Lightweight spans kept in an in-memory ring buffer (queried via /traces)
+and optionally appended to a JSONL file. No external collector needed.
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, List, Optional
+
+from log_config import DroppingQueueHandler
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+# Spans kept in memory for /traces (oldest dropped first)
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "5000"))
+# Also append every span as one JSON line to this file (empty disables)
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+TRACE_HEADER = "x-trace-id"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "duration_ms", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], start: float):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start
+        self.duration_ms = 0.0
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+class SpanExporter:
+    """Ring buffer of finished spans, plus an optional non-blocking JSONL file sink"""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE, path: str = TRACE_FILE):
+        self._lock = threading.Lock()
+        self._spans: deque = deque(maxlen=size)
+        self._file_logger: Optional[logging.Logger] = None
+        if path:
+            # Same pattern as the app logs: a bounded queue drained by a thread
+            span_queue = queue.Queue(maxsize=size)
+            handler = logging.FileHandler(path, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            listener = logging.handlers.QueueListener(span_queue, handler)
+            listener.start()
+            atexit.register(listener.stop)
+            self._file_logger = logging.getLogger("tracing.spans")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.addHandler(DroppingQueueHandler(span_queue))
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(span.to_dict(), default=str))
+
+    def trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            spans = [s for s in self._spans if s.trace_id == trace_id]
+        return [s.to_dict() for s in sorted(spans, key=lambda s: s.start)]
+
+    def recent_roots(self, limit: int, min_duration_ms: float = 0.0,
+                     name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Newest root spans first (one per trace), optionally only slow ones"""
+        results = []
+        with self._lock:
+            for span in reversed(self._spans):
+                if span.parent_id is not None or span.duration_ms < min_duration_ms:
+                    continue
+                if name and not span.name.startswith(name):
+                    continue
+                results.append(span)
+                if len(results) >= limit:
+                    break
+        return [s.to_dict() for s in results]
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attributes) -> Iterator[Span]:
+    """
+    Time the block as a child of the current span (or as the root of
+    ``trace_id``). Exceptions are recorded on the span and re-raised.
+
+    Do not hold this across a ``yield`` in a generator; use ``record_span``.
+    """
+    parent = _current_span.get()
+    current = Span(
+        name,
+        parent.trace_id if parent else (trace_id or new_trace_id()),
+        parent.span_id if parent else None,
+        time.time()
+    )
+    current.attributes.update(attributes)
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - started) * 1000
+        _current_span.reset(token)
+        if TRACING_ENABLED:
+            exporter.export(current)
+
+def record_span(name: str, started: float, error: Optional[str] = None, **attributes) -> Optional[Span]:
+    """
+    Record an already finished child of the current span that began at
+    ``started`` (a time.perf_counter() value) and ends now.
+    """
+    parent = _current_span.get()
+    if parent is None or not TRACING_ENABLED:
+        return None
+    duration_ms = (time.perf_counter() - started) * 1000
+    finished = Span(name, parent.trace_id, parent.span_id, time.time() - duration_ms / 1000)
+    finished.duration_ms = duration_ms
+    finished.attributes.update(attributes)
+    finished.error = error
+    exporter.export(finished)
+    return finished
+
+def current_trace_id() -> Optional[str]:
+    parent = _current_span.get()
+    return parent.trace_id if parent else None
+
+# Global instance
+exporter = SpanExporter()
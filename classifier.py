@@ -4,61 +4,78 @@ Advanced text classifier for TechGuide Bot
 Uses simple NLP techniques for better classification
 """
 
-from typing import Dict, Tuple
+from typing import Any, Dict, List, Tuple
+import json
+import os
 import re
 
+from backend.fuzzy_index import FuzzyIndex
+
+KB_PATH = os.getenv(
+    "KB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend", "data", "knowledge_base.json")
+)
+
 class InterestClassifier:
     """
     Classifies user interest text into programming categories
     """
     
-    def __init__(self):
+    def __init__(self, kb_path: str = KB_PATH):
+        # Tiered keywords live next to the backend's keyword lists in the
+        # shared knowledge-base file (categories without tiers are skipped)
+        with open(kb_path, encoding="utf-8") as f:
+            categories = json.load(f)["categories"]
         self.keywords = {
-            "1": {  # Web Development
-                "primary": ["web", "website", "frontend", "backend", "fullstack"],
-                "secondary": ["html", "css", "javascript", "react", "vue", "angular", "node"],
-                "context": ["browser", "http", "server", "client", "responsive"]
-            },
-            "2": {  # Data Science
-                "primary": ["data", "analytics", "machine learning", "ai", "science"],
-                "secondary": ["python", "pandas", "numpy", "tensorflow", "analysis"],
-                "context": ["model", "prediction", "statistics", "visualization", "dataset"]
-            },
-            "3": {  # Mobile Apps
-                "primary": ["mobile", "app", "ios", "android", "smartphone"],
-                "secondary": ["swift", "kotlin", "flutter", "react native"],
-                "context": ["phone", "tablet", "device", "touch", "notification"]
-            },
-            "4": {  # Game Development
-                "primary": ["game", "gaming", "3d", "graphics"],
-                "secondary": ["unity", "unreal", "engine", "animation"],
-                "context": ["character", "level", "physics", "render", "gameplay"]
-            }
+            choice: data["keyword_tiers"]
+            for choice, data in categories.items()
+            if "keyword_tiers" in data
         }
+        self.fuzzy = FuzzyIndex({
+            word
+            for tiers in self.keywords.values()
+            for keywords in tiers.values()
+            for keyword in keywords
+            for word in keyword.split()
+        })
     
     def classify(self, text: str) -> Tuple[str, float, Dict]:
         """
         Classify text and return choice, confidence, and scores
         """
+        details = self.classify_with_details(text)
+        return details["choice"], details["confidence"], details["scores"]
+    
+    def classify_with_details(self, text: str) -> Dict[str, Any]:
+        """
+        Like classify(), plus the misspelled words that were matched fuzzily
+        """
         text_lower = text.lower()
-        scores = {"1": 0, "2": 0, "3": 0, "4": 0}
+        scores = {choice: 0 for choice in self.keywords}
+        
+        # Correct misspelled words against the keyword vocabulary
+        tokens = re.findall(r"[a-z0-9+#]+", text_lower)
+        corrections = {}
+        for token in tokens:
+            hit = self.fuzzy.lookup(token)
+            if hit is not None:
+                corrections[token] = hit
+        corrected_text = " ".join(corrections[t][0] if t in corrections else t for t in tokens)
+        corrected_words = {word for word, _ in corrections.values()}
+        used_words = set()
         
-        # Score each category
+        # Score each category: primary 3, secondary 2, context 1.
+        # A keyword only found after typo correction scores one point less.
         for choice, keywords in self.keywords.items():
-            # Primary keywords (weight: 3)
-            for keyword in keywords["primary"]:
-                if keyword in text_lower:
-                    scores[choice] += 3
-            
-            # Secondary keywords (weight: 2)
-            for keyword in keywords["secondary"]:
-                if keyword in text_lower:
-                    scores[choice] += 2
-            
-            # Context keywords (weight: 1)
-            for keyword in keywords["context"]:
-                if keyword in text_lower:
-                    scores[choice] += 1
+            for tier, weight in (("primary", 3), ("secondary", 2), ("context", 1)):
+                for keyword in keywords[tier]:
+                    if keyword in text_lower:
+                        scores[choice] += weight
+                    elif corrections and keyword in corrected_text and weight > 1:
+                        words = set(keyword.split()) & corrected_words
+                        if words:
+                            scores[choice] += weight - 1
+                            used_words |= words
         
         # Find best match
         max_score = max(scores.values())
@@ -68,7 +85,17 @@ class InterestClassifier:
         total_score = sum(scores.values())
         confidence = (max_score / total_score) if total_score > 0 else 0.0
         
-        return best_choice, confidence, scores
+        fuzzy_matches: List[Dict[str, Any]] = [
+            {"token": token, "keyword": word, "distance": distance}
+            for token, (word, distance) in corrections.items()
+            if word in used_words
+        ]
+        return {
+            "choice": best_choice,
+            "confidence": confidence,
+            "scores": scores,
+            "fuzzy_matches": fuzzy_matches
+        }
 
 # Standalone testing
 if __name__ == "__main__":
@@ -78,7 +105,8 @@ if __name__ == "__main__":
         "I want to build websites",
         "I'm interested in machine learning and AI",
         "I want to create mobile apps for iOS",
-        "I love making video games"
+        "I love making video games",
+        "pyhton data scince"
     ]
     
     for text in test_cases:
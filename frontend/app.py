@@ -6,10 +6,18 @@ Professional ChatGPT-style interface with proper alignment
 
 import streamlit as st
 import requests
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import websocket
+from typing import Dict, Any, Optional, Callable
 from datetime import datetime
-import time
+from collections import deque
 import os
+import re
+import json
+import queue
+import threading
+import time
 import uuid
 
 # ============================================================================
@@ -18,6 +26,34 @@ import uuid
 
 BACKEND_URL = os.getenv("BACKEND_URL", "https://jac-techguide-bot.onrender.com")
 
+# HTTP client tuning (seconds / counts)
+CONNECT_TIMEOUT = float(os.getenv("BACKEND_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("BACKEND_READ_TIMEOUT", "15"))
+HEALTH_READ_TIMEOUT = float(os.getenv("BACKEND_HEALTH_READ_TIMEOUT", "5"))
+HTTP_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("BACKEND_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("BACKEND_BACKOFF_FACTOR", "0.3"))
+
+# Background health polling (seconds); status older than the TTL is "unknown"
+HEALTH_POLL_INTERVAL = float(os.getenv("HEALTH_POLL_INTERVAL", "15"))
+HEALTH_STATUS_TTL = float(os.getenv("HEALTH_STATUS_TTL", "45"))
+HEALTH_LATENCY_WINDOW = int(os.getenv("HEALTH_LATENCY_WINDOW", "20"))
+
+# Chat over one long-lived WebSocket per session (falls back to HTTP POST)
+USE_WEBSOCKET = os.getenv("USE_WEBSOCKET", "true").lower() == "true"
+WS_URL = BACKEND_URL.replace("http", "ws", 1) + "/ws/chat"
+
+# Number of most recent messages rendered per run ("load earlier" adds more)
+CHAT_WINDOW_SIZE = int(os.getenv("CHAT_WINDOW_SIZE", "20"))
+
+# Sidebar quick-start buttons: (intent id served by POST /quick-start/{id}, label, prompt)
+QUICK_START_INTENTS = (
+    ("web", "Web Dev", "I want to build websites"),
+    ("data", "Data Science", "I want to work with data"),
+    ("mobile", "Mobile Apps", "I want to create mobile apps"),
+    ("games", "Game Dev", "I want to make games"),
+)
+
 # Page configuration
 st.set_page_config(
     page_title="TechGuide AI - Your Programming Mentor",
@@ -30,7 +66,7 @@ st.set_page_config(
 # ENHANCED MODERN STYLING WITH PROPER ALIGNMENT
 # ============================================================================
 
-st.markdown("""
+APP_CSS = """
 <style>
     /* ==================== GLOBAL THEME ==================== */
     :root {
@@ -414,7 +450,19 @@ st.markdown("""
         }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource
+def get_app_css() -> str:
+    """Minified stylesheet, built once per process and shared by all sessions"""
+    css = re.sub(r"/\*.*?\*/", "", APP_CSS, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,])\s*", r"\1", css)
+    return css.strip()
+
+# Streamlit drops any element a run does not re-emit, so the stylesheet has to
+# be sent on every rerun; it is minified once and the frontend diffs it away.
+st.markdown(get_app_css(), unsafe_allow_html=True)
 
 # ============================================================================
 # SESSION STATE
@@ -442,38 +490,388 @@ I help developers at all levels discover the perfect technology for their goals.
 if "session_id" not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
 
-if "backend_status" not in st.session_state:
-    st.session_state.backend_status = None
+if "visible_messages" not in st.session_state:
+    st.session_state.visible_messages = CHAT_WINDOW_SIZE
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Process-wide HTTP session with keep-alive pooling and bounded retries.
+
+    Connection failures are retried for every method (nothing reached the
+    server yet); read and status retries only apply to idempotent methods so
+    a slow ``POST /chat`` is never replayed.
+    """
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        read=HTTP_MAX_RETRIES,
+        status=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+class OfflineKnowledgeBase:
+    """Local copy of the backend knowledge base, refetched only when its hash changes"""
+    
+    def __init__(self, http: requests.Session):
+        self._http = http
+        self._lock = threading.Lock()
+        self.version: Optional[str] = None
+        self._data: Optional[Dict[str, Any]] = None
+        self._index: tuple = ()
+    
+    def sync(self, health: Dict[str, Any]):
+        """Refresh when /health advertises a kb_version we do not have yet"""
+        version = health.get("kb_version")
+        if version and version != self.version:
+            self.refresh()
+    
+    def refresh(self) -> bool:
+        headers = {"If-None-Match": f'"{self.version}"'} if self.version else {}
+        try:
+            response = self._http.get(
+                f"{BACKEND_URL}/kb/snapshot",
+                headers=headers,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+            )
+            if response.status_code != 200:
+                return response.status_code == 304
+            data = response.json()
+        except (requests.RequestException, ValueError):
+            return False
+        
+        # Flatten keywords once per version so classification is a single pass
+        index = tuple(
+            (keyword, f" {keyword} ", choice)
+            for choice, keywords in data["keywords"].items()
+            for keyword in keywords
+        )
+        with self._lock:
+            self._data, self._index, self.version = data, index, data["version"]
+        return True
+    
+    def recommend(self, message: str) -> Optional[Dict[str, Any]]:
+        """Same keyword scoring as the backend; None when unsure or not loaded"""
+        with self._lock:
+            data, index = self._data, self._index
+        if data is None:
+            return None
+        
+        text_lower = message.lower()
+        padded = f" {' '.join(re.findall(r'[a-z0-9+#]+', text_lower))} "
+        scores: Dict[str, int] = {}
+        for keyword, padded_keyword, choice in index:
+            if keyword in text_lower:
+                exact = padded_keyword in padded
+                scores[choice] = scores.get(choice, 0) + (3 if exact else 1)
+        
+        if not scores or max(scores.values()) < 2:
+            return None
+        choice = max(scores, key=scores.get)
+        choice_data = data["interest_map"][choice]
+        lang = choice_data["lang"]
+        return {
+            "status": "ok",
+            "language": lang,
+            "reason": choice_data["reason"],
+            "resources": data["resources_map"].get(lang, []),
+            "metadata": {
+                "difficulty": choice_data["difficulty"],
+                "estimated_time": choice_data["time"],
+                "learning_path": choice_data["learning_path"],
+                "career_paths": choice_data["career_paths"],
+                "kb_version": data["version"]
+            },
+            "type": "recommendation",
+            "offline": True
+        }
+
+@st.cache_resource
+def get_offline_kb() -> OfflineKnowledgeBase:
+    return OfflineKnowledgeBase(get_http_session())
+
+class BackendHealthMonitor:
+    """Polls /health in a daemon thread and caches the result for every session"""
+    
+    def __init__(self, http: requests.Session, interval: float, ttl: float,
+                 on_health: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self._http = http
+        self._on_health = on_health
+        self._interval = interval
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._status = "unknown"
+        self._data: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._latencies = deque(maxlen=HEALTH_LATENCY_WINDOW)
+        threading.Thread(target=self._run, name="backend-health-monitor", daemon=True).start()
+    
+    def _run(self):
+        while True:
+            self.poll()
+            self._wake.wait(self._interval)
+            self._wake.clear()
+    
+    def poll(self) -> Dict[str, Any]:
+        """Probe the backend now (blocking) and return the fresh snapshot"""
+        started = time.monotonic()
+        try:
+            response = self._http.get(
+                f"{BACKEND_URL}/health",
+                timeout=(CONNECT_TIMEOUT, HEALTH_READ_TIMEOUT)
+            )
+            if response.status_code == 200:
+                data = response.json()
+                self.record("online", time.monotonic() - started, data)
+                if self._on_health:
+                    self._on_health(data)
+            else:
+                self.record("error")
+        except (requests.RequestException, ValueError):
+            self.record("offline")
+        return self.snapshot()
+    
+    def wake(self):
+        """Ask the poller thread to probe on its next loop instead of waiting"""
+        self._wake.set()
+    
+    def record(self, status: str, latency: Optional[float] = None, data: Optional[Dict[str, Any]] = None):
+        """Update the cached status; chat calls report here passively too"""
+        with self._lock:
+            self._status = status
+            self._checked_at = time.time()
+            if latency is not None:
+                self._latencies.append(latency)
+            if data is not None:
+                self._data = data
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            age = time.time() - self._checked_at
+            status = self._status if age <= self._ttl else "unknown"
+            last_latency = self._latencies[-1] if self._latencies else None
+            latencies = sorted(self._latencies)
+            data = self._data
+        latency_ms = None
+        if latencies:
+            latency_ms = {
+                "last": round(last_latency * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1)
+            }
+        return {"status": status, "age": age, "latency_ms": latency_ms, "data": data}
+    
+    def is_down(self) -> bool:
+        """True only while a fresh probe says the backend is unreachable"""
+        return self.snapshot()["status"] in ("offline", "error")
+
+@st.cache_resource
+def get_health_monitor() -> BackendHealthMonitor:
+    return BackendHealthMonitor(
+        get_http_session(),
+        HEALTH_POLL_INTERVAL,
+        HEALTH_STATUS_TTL,
+        on_health=get_offline_kb().sync
+    )
+
 def check_backend_health() -> Dict[str, Any]:
+    """Ask the poller for a fresh probe and return the cached status without blocking"""
+    monitor = get_health_monitor()
+    monitor.wake()
+    return monitor.snapshot()
+
+class ChatSocket:
+    """One long-lived /ws/chat connection per browser session.
+
+    A daemon thread owns all reads: it answers server pings (so the socket
+    survives idle time between Streamlit reruns) and queues other frames
+    for the turn currently waiting in chat().
+    """
+    
+    def __init__(self, session_id: str):
+        self._ws = websocket.create_connection(
+            f"{WS_URL}?session_id={session_id}",
+            timeout=CONNECT_TIMEOUT
+        )
+        self._ws.settimeout(None)
+        self._frames: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._send_lock = threading.Lock()
+        self.session_id = session_id
+        self.closed = False
+        threading.Thread(target=self._read_loop, name="chat-socket-reader", daemon=True).start()
+    
+    def _send(self, frame: Dict[str, Any]):
+        with self._send_lock:
+            self._ws.send(json.dumps(frame))
+    
+    def _read_loop(self):
+        try:
+            while True:
+                frame = json.loads(self._ws.recv())
+                if frame.get("type") == "ping":
+                    self._send({"type": "pong"})
+                else:
+                    self._frames.put(frame)
+        except (websocket.WebSocketException, OSError, ValueError):
+            self.closed = True
+            self._frames.put({"type": "closed"})
+    
+    def chat(self, message: str, on_chunk: Optional[Callable[[str], None]] = None,
+             trace_id: Optional[str] = None) -> Dict[str, Any]:
+        """Send one turn and wait for its result; raises ConnectionError/TimeoutError"""
+        while not self._frames.empty():
+            self._frames.get_nowait()
+        self._send({"type": "message", "message": message, "trace_id": trace_id})
+        
+        deadline = time.monotonic() + READ_TIMEOUT
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                frame = self._frames.get(timeout=max(remaining, 0.001))
+            except queue.Empty:
+                raise TimeoutError("No response on chat socket")
+            kind = frame.get("type")
+            if kind == "chunk" and on_chunk:
+                on_chunk(frame["text"])
+            elif kind == "response":
+                return frame["result"]
+            elif kind == "error":
+                return {"status": "error", "response": f"Backend error: {frame.get('detail')}"}
+            elif kind == "closed":
+                raise ConnectionError("Chat socket closed")
+    
+    def close(self):
+        self.closed = True
+        try:
+            self._ws.close()
+        except (websocket.WebSocketException, OSError):
+            pass
+
+def get_chat_socket() -> Optional[ChatSocket]:
+    """Reuse this session's socket, reconnecting if it dropped; None if unavailable"""
+    sock = st.session_state.get("chat_socket")
+    if sock is not None and not sock.closed and sock.session_id == st.session_state.session_id:
+        return sock
+    if sock is not None:
+        sock.close()
     try:
-        response = requests.get(f"{BACKEND_URL}/health", timeout=5)
-        if response.status_code == 200:
-            return {"status": "online", "data": response.json()}
-        return {"status": "error"}
-    except:
-        return {"status": "offline"}
+        sock = ChatSocket(st.session_state.session_id)
+    except (websocket.WebSocketException, OSError):
+        sock = None
+    st.session_state.chat_socket = sock
+    return sock
+
+def record_trace(trace_id: str, transport: str, started: float):
+    """Client-side timing of the last turn, to line up with the backend's spans"""
+    st.session_state.last_trace = {
+        "trace_id": trace_id,
+        "transport": transport,
+        "round_trip_ms": (time.monotonic() - started) * 1000
+    }
 
-def send_chat_message(message: str) -> Dict[str, Any]:
+def send_chat_message(message: str, on_chunk: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    monitor = get_health_monitor()
+    # Known-down backend: answer locally instead of waiting out the timeout
+    if monitor.is_down():
+        return use_fallback_logic(message)
+    
+    # One trace id per turn; the backend records its spans under it (see /traces)
+    trace_id = uuid.uuid4().hex
+    started = time.monotonic()
+    if USE_WEBSOCKET:
+        sock = get_chat_socket()
+        if sock is not None:
+            try:
+                result = sock.chat(message, on_chunk, trace_id)
+                monitor.record("online", time.monotonic() - started)
+                record_trace(trace_id, "websocket", started)
+                return result
+            except (ConnectionError, TimeoutError, websocket.WebSocketException, OSError):
+                # Drop the socket and retry this turn over plain HTTP. The
+                # trace id is the idempotency key on both transports, so if the
+                # socket turn is still running the backend attaches to it
+                sock.close()
+                started = time.monotonic()
+    
     try:
-        response = requests.post(
+        response = get_http_session().post(
             f"{BACKEND_URL}/chat",
             json={"message": message, "session_id": st.session_state.session_id},
-            timeout=15
+            # The turn's trace id doubles as its idempotency key, so a proxy
+            # retrying this POST gets the original answer, not a second AI call
+            headers={"X-Trace-ID": trace_id, "Idempotency-Key": trace_id},
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
         )
         if response.status_code == 200:
+            monitor.record("online", time.monotonic() - started)
+            record_trace(trace_id, "http", started)
             return response.json()
         return {"status": "error", "response": f"Backend error: {response.status_code}"}
     except requests.exceptions.ConnectionError:
+        monitor.record("offline")
+        monitor.wake()
         return use_fallback_logic(message)
     except Exception as e:
         return {"status": "error", "response": f"Error: {str(e)}"}
 
+def send_quick_start(intent_id: str, message: str) -> Dict[str, Any]:
+    """
+    Precomputed answer for a quick-start button. Falls back to a normal chat
+    turn only when the backend does not know the intent (404), otherwise to
+    the local knowledge-base snapshot.
+    """
+    monitor = get_health_monitor()
+    if monitor.is_down():
+        return use_fallback_logic(message)
+    
+    trace_id = uuid.uuid4().hex
+    started = time.monotonic()
+    try:
+        response = get_http_session().post(
+            f"{BACKEND_URL}/quick-start/{intent_id}",
+            json={"session_id": st.session_state.session_id},
+            headers={"X-Trace-ID": trace_id},
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+        )
+    except requests.exceptions.ConnectionError:
+        monitor.record("offline")
+        monitor.wake()
+        return use_fallback_logic(message)
+    except Exception as e:
+        return {"status": "error", "response": f"Error: {str(e)}"}
+    if response.status_code == 200:
+        monitor.record("online", time.monotonic() - started)
+        record_trace(trace_id, "http", started)
+        return response.json()
+    # Older backends without /quick-start (or an unknown intent) answer the prompt as chat
+    if response.status_code == 404:
+        return send_chat_message(message)
+    # A failing backend would only fail slower on the AI chat path; answer locally
+    return use_fallback_logic(message)
+
 def use_fallback_logic(message: str) -> Dict[str, Any]:
+    # Full recommendation cards from the cached knowledge-base snapshot
+    recommendation = get_offline_kb().recommend(message)
+    if recommendation:
+        return recommendation
+    
     msg_lower = message.lower()
     
     if any(word in msg_lower for word in ["web", "website", "frontend"]):
@@ -501,63 +899,84 @@ def use_fallback_logic(message: str) -> Dict[str, Any]:
             "type": "greeting"
         }
 
-def display_learning_path(learning_path: list):
-    st.markdown("### Learning Journey")
-    for phase in learning_path:
-        topics_html = "".join([f"<li>{topic}</li>" for topic in phase['topics']])
-        st.markdown(f"""
-        <div class="timeline-item">
-            <h4>{phase['phase']}<span class="duration">({phase['duration']})</span></h4>
-            <ul>{topics_html}</ul>
-        </div>
-        """, unsafe_allow_html=True)
-
-def display_resources(resources: list):
-    st.markdown("### Learning Resources")
+def render_learning_path(learning_path: list) -> str:
+    phases_html = "".join([
+        f'<div class="timeline-item">'
+        f'<h4>{phase["phase"]}<span class="duration">({phase["duration"]})</span></h4>'
+        f'<ul>{"".join([f"<li>{topic}</li>" for topic in phase["topics"]])}</ul>'
+        f'</div>'
+        for phase in learning_path
+    ])
+    return f"### Learning Journey\n\n{phases_html}"
+
+def render_resources(resources: list) -> str:
+    items = []
     for idx, resource in enumerate(resources, 1):
         if " - " in resource:
             name, url = resource.split(" - ", 1)
-            st.markdown(f"""
-            <div class="resource-link">
-                <strong>{idx}. {name}</strong><br>
-                <a href="{url}" target="_blank">{url}</a>
-            </div>
-            """, unsafe_allow_html=True)
+            items.append(
+                f'<div class="resource-link"><strong>{idx}. {name}</strong><br>'
+                f'<a href="{url}" target="_blank">{url}</a></div>'
+            )
         else:
-            st.markdown(f'<div class="resource-link"><strong>{idx}. {resource}</strong></div>', unsafe_allow_html=True)
+            items.append(f'<div class="resource-link"><strong>{idx}. {resource}</strong></div>')
+    return f"### Learning Resources\n\n{''.join(items)}"
 
-def display_career_paths(career_paths: list):
-    st.markdown("### Career Opportunities")
+def render_career_paths(career_paths: list) -> str:
     badges_html = "".join([f'<span class="career-badge">{path}</span>' for path in career_paths])
-    st.markdown(f'<div>{badges_html}</div>', unsafe_allow_html=True)
+    return f"### Career Opportunities\n\n<div>{badges_html}</div>"
 
-def display_recommendation(result: Dict[str, Any]):
+def render_recommendation(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Build every HTML fragment of a recommendation card once"""
+    metadata = result.get("metadata", {})
+    resources = result.get("resources", [])
+    fragments = {
+        "title": f'<div class="recommendation-card"><h1 class="language-title">{result.get("language")}</h1></div>',
+        "metrics": [],
+        "reason": (
+            "### Why This Language?\n\n"
+            f"<p style='font-size: 1.05rem; line-height: 1.8; color: var(--text-secondary);'>{result.get('reason', '')}</p>"
+        ),
+        "sections": []
+    }
+    if metadata:
+        fragments["metrics"] = [
+            f'<div class="metric-card"><h3>Difficulty</h3><h2>{metadata.get("difficulty", "N/A")}</h2></div>',
+            f'<div class="metric-card"><h3>Timeline</h3><h2>{metadata.get("estimated_time", "N/A")}</h2></div>',
+            f'<div class="metric-card"><h3>Careers</h3><h2>{len(metadata.get("career_paths", []))}</h2></div>'
+        ]
+    if metadata.get("learning_path"):
+        fragments["sections"].append(render_learning_path(metadata["learning_path"]))
+    if resources:
+        fragments["sections"].append(render_resources(resources))
+    if metadata.get("career_paths"):
+        fragments["sections"].append(render_career_paths(metadata["career_paths"]))
+    return fragments
+
+def display_recommendation(result: Dict[str, Any], fragments: Optional[Dict[str, Any]] = None):
     if result.get("type") == "recommendation" and result.get("language"):
-        language = result.get("language")
-        reason = result.get("reason", "")
-        resources = result.get("resources", [])
-        metadata = result.get("metadata", {})
+        fragments = fragments or render_recommendation(result)
         
-        st.markdown(f'<div class="recommendation-card"><h1 class="language-title">{language}</h1></div>', unsafe_allow_html=True)
+        st.markdown(fragments["title"], unsafe_allow_html=True)
         
-        if metadata:
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.markdown(f'<div class="metric-card"><h3>Difficulty</h3><h2>{metadata.get("difficulty", "N/A")}</h2></div>', unsafe_allow_html=True)
-            with col2:
-                st.markdown(f'<div class="metric-card"><h3>Timeline</h3><h2>{metadata.get("estimated_time", "N/A")}</h2></div>', unsafe_allow_html=True)
-            with col3:
-                st.markdown(f'<div class="metric-card"><h3>Careers</h3><h2>{len(metadata.get("career_paths", []))}</h2></div>', unsafe_allow_html=True)
+        if fragments["metrics"]:
+            for col, metric_html in zip(st.columns(3), fragments["metrics"]):
+                with col:
+                    st.markdown(metric_html, unsafe_allow_html=True)
         
-        st.markdown("### Why This Language?")
-        st.markdown(f"<p style='font-size: 1.05rem; line-height: 1.8; color: var(--text-secondary);'>{reason}</p>", unsafe_allow_html=True)
-        
-        if metadata.get("learning_path"):
-            display_learning_path(metadata["learning_path"])
-        if resources:
-            display_resources(resources)
-        if metadata.get("career_paths"):
-            display_career_paths(metadata["career_paths"])
+        st.markdown(fragments["reason"], unsafe_allow_html=True)
+        for section_html in fragments["sections"]:
+            st.markdown(section_html, unsafe_allow_html=True)
+
+def display_message(message: Dict[str, Any]):
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+        data = message.get("data")
+        if data and data.get("type") == "recommendation" and data.get("language"):
+            # Fragments are memoized on the message so reruns skip the rebuild
+            if "html" not in message:
+                message["html"] = render_recommendation(data)
+            display_recommendation(data, message["html"])
 
 # ============================================================================
 # SIDEBAR
@@ -570,40 +989,34 @@ with st.sidebar:
     
     st.markdown("### Connection")
     if st.button("Check Status", use_container_width=True):
-        st.session_state.backend_status = check_backend_health()
+        # The probe runs on the poller thread; this rerun shows the cached status
+        backend_status = check_backend_health()
+        st.caption("Re-checking in the background...")
+    else:
+        backend_status = get_health_monitor().snapshot()
+    
+    if backend_status["status"] == "online":
+        st.markdown('<span class="status-badge status-online">Connected</span>', unsafe_allow_html=True)
+        if backend_status["latency_ms"]:
+            st.caption(f"Latency: {backend_status['latency_ms']['last']:.0f} ms (p50 {backend_status['latency_ms']['p50']:.0f} ms)")
+    elif backend_status["status"] == "unknown":
+        st.markdown('<span class="status-badge">Checking...</span>', unsafe_allow_html=True)
+    else:
+        st.markdown('<span class="status-badge status-offline">Offline Mode</span>', unsafe_allow_html=True)
     
-    if st.session_state.backend_status:
-        if st.session_state.backend_status.get("status") == "online":
-            st.markdown('<span class="status-badge status-online">Connected</span>', unsafe_allow_html=True)
-        else:
-            st.markdown('<span class="status-badge status-offline">Offline Mode</span>', unsafe_allow_html=True)
+    last_trace = st.session_state.get("last_trace")
+    if last_trace:
+        st.caption(f"Last reply: {last_trace['round_trip_ms']:.0f} ms via {last_trace['transport']} · trace `{last_trace['trace_id']}`")
     
     st.markdown("---")
     st.markdown("### Quick Start")
     
-    if st.button("Web Dev", use_container_width=True):
-        response = send_chat_message("I want to build websites")
-        st.session_state.messages.append({"role": "user", "content": "I want to build websites", "timestamp": datetime.now().isoformat()})
-        st.session_state.messages.append({"role": "assistant", "content": response.get("response", ""), "data": response, "timestamp": datetime.now().isoformat()})
-        st.rerun()
-    
-    if st.button("Data Science", use_container_width=True):
-        response = send_chat_message("I want to work with data")
-        st.session_state.messages.append({"role": "user", "content": "I want to work with data", "timestamp": datetime.now().isoformat()})
-        st.session_state.messages.append({"role": "assistant", "content": response.get("response", ""), "data": response, "timestamp": datetime.now().isoformat()})
-        st.rerun()
-    
-    if st.button("Mobile Apps", use_container_width=True):
-        response = send_chat_message("I want to create mobile apps")
-        st.session_state.messages.append({"role": "user", "content": "I want to create mobile apps", "timestamp": datetime.now().isoformat()})
-        st.session_state.messages.append({"role": "assistant", "content": response.get("response", ""), "data": response, "timestamp": datetime.now().isoformat()})
-        st.rerun()
-    
-    if st.button("Game Dev", use_container_width=True):
-        response = send_chat_message("I want to make games")
-        st.session_state.messages.append({"role": "user", "content": "I want to make games", "timestamp": datetime.now().isoformat()})
-        st.session_state.messages.append({"role": "assistant", "content": response.get("response", ""), "data": response, "timestamp": datetime.now().isoformat()})
-        st.rerun()
+    for intent_id, label, prompt in QUICK_START_INTENTS:
+        if st.button(label, use_container_width=True):
+            response = send_quick_start(intent_id, prompt)
+            st.session_state.messages.append({"role": "user", "content": prompt, "timestamp": datetime.now().isoformat()})
+            st.session_state.messages.append({"role": "assistant", "content": response.get("response", ""), "data": response, "timestamp": datetime.now().isoformat()})
+            st.rerun()
     
     st.markdown("---")
     st.markdown("### Session")
@@ -612,7 +1025,11 @@ with st.sidebar:
     
     if st.button("New Chat", type="primary", use_container_width=True):
         st.session_state.session_id = str(uuid.uuid4())
+        if st.session_state.get("chat_socket"):
+            st.session_state.chat_socket.close()
+            st.session_state.chat_socket = None
         st.session_state.messages = [{"role": "assistant", "content": "Hello! I'm TechGuide AI. What would you like to build?", "timestamp": datetime.now().isoformat()}]
+        st.session_state.visible_messages = CHAT_WINDOW_SIZE
         st.rerun()
 
 # ============================================================================
@@ -621,13 +1038,16 @@ with st.sidebar:
 
 st.markdown('<div class="main-header"><h1>TechGuide AI</h1><p>Your Intelligent Programming Language Advisor</p></div>', unsafe_allow_html=True)
 
-# Display messages
-for message in st.session_state.messages:
-    role = message["role"]
-    with st.chat_message(role):
-        st.markdown(message["content"])
-        if "data" in message and message["data"].get("type") == "recommendation":
-            display_recommendation(message["data"])
+# Display only the most recent window of messages
+messages = st.session_state.messages
+hidden_count = max(0, len(messages) - st.session_state.visible_messages)
+if hidden_count:
+    if st.button(f"Load earlier messages ({hidden_count} hidden)", use_container_width=True):
+        st.session_state.visible_messages += CHAT_WINDOW_SIZE
+        st.rerun()
+
+for message in messages[hidden_count:]:
+    display_message(message)
 
 # Chat input
 user_input = st.chat_input("Tell me what you want to build...")
@@ -636,9 +1056,15 @@ if user_input:
     st.session_state.messages.append({"role": "user", "content": user_input, "timestamp": datetime.now().isoformat()})
     
     with st.chat_message("assistant"):
+        placeholder = st.empty()
+        streamed = []
+        
+        def show_chunk(text: str):
+            streamed.append(text)
+            placeholder.markdown("".join(streamed) + "▌")
+        
         with st.spinner(""):
-            time.sleep(0.3)
-            response = send_chat_message(user_input)
+            response = send_chat_message(user_input, on_chunk=show_chunk)
     
     bot_message = {
         "role": "assistant",